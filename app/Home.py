@@ -1,66 +1,50 @@
-import os
-import psycopg2
 import pandas as pd
 import streamlit as st
 
-# --- Env loading (local) + Secrets (cloud) ---
-try:
-    from dotenv import load_dotenv  # optional in cloud
-    load_dotenv()
-except Exception:
-    pass
+from _db import pooled_cursor, q_df
 
-def get_setting(name: str, secret_fallback: bool = True) -> str:
-    """
-    Reads config from environment first; falls back to Streamlit secrets when available.
-    """
-    v = os.getenv(name)
-    if v:
-        return v
-    if secret_fallback:
-        try:
-            return st.secrets[name]
-        except Exception:
-            pass
-    raise RuntimeError(
-        f"Missing required setting: {name}. "
-        f"Set it in .env (local) or Streamlit Secrets (cloud)."
-    )
+st.set_page_config(page_title="Scout Console", layout="wide")
 
-DB = get_setting("DATABASE_URL")
 
-st.set_page_config(page_title="Scout Console", layout="wide")
+COMPANY_COLUMNS = ["company_id", "name", "website", "domain", "updated_at"]
+COMPANY_DTYPES = {"updated_at": "datetime"}
+
 
 @st.cache_data(ttl=30)
 def load_companies(q: str = "") -> pd.DataFrame:
-    conn = psycopg2.connect(DB)
-    try:
-        with conn.cursor() as cur:
-            if q:
-                cur.execute(
-                    """
-                    SELECT company_id::text, name, website, domain, updated_at
-                    FROM companies
-                    WHERE lower(name) LIKE %s OR lower(domain) LIKE %s
-                    ORDER BY updated_at DESC
-                    LIMIT 200
-                    """,
-                    (f"%{q.lower()}%", f"%{q.lower()}%"),
-                )
-            else:
-                cur.execute(
-                    """
-                    SELECT company_id::text, name, website, domain, updated_at
-                    FROM companies
-                    ORDER BY updated_at DESC
-                    LIMIT 200
-                    """
-                )
-            rows = cur.fetchall()
-    finally:
-        conn.close()
-
-    return pd.DataFrame(rows, columns=["company_id", "name", "website", "domain", "updated_at"])
+    q = q.strip().lower()
+    with pooled_cursor() as cur:
+        if q:
+            # predicate must stay lower(col) LIKE to match the trigram indexes
+            # (sql/001_companies_search_indexes.sql)
+            pattern = f"%{q}%"
+            return q_df(
+                cur,
+                "companies_search",
+                """
+                SELECT company_id::text, name, website, domain, updated_at
+                FROM companies
+                WHERE lower(name) LIKE %s OR lower(domain) LIKE %s
+                ORDER BY updated_at DESC
+                LIMIT 200
+                """,
+                (pattern, pattern),
+                columns=COMPANY_COLUMNS,
+                dtypes=COMPANY_DTYPES,
+            )
+        else:
+            return q_df(
+                cur,
+                "companies_recent",
+                """
+                SELECT company_id::text, name, website, domain, updated_at
+                FROM companies
+                ORDER BY updated_at DESC
+                LIMIT 200
+                """,
+                columns=COMPANY_COLUMNS,
+                dtypes=COMPANY_DTYPES,
+            )
 
 
 st.title("Scout Console")
@@ -0,0 +1,154 @@
+"""
+Shared DB helpers for the console pages.
+Streamlit runs all pages in one process, so the cached pool below is shared by every page.
+"""
+import os
+import re
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+from psycopg2.extensions import connection as PgConnection
+from psycopg2.pool import ThreadedConnectionPool
+import pandas as pd
+import streamlit as st
+
+# `streamlit run app/Home.py` only puts app/ on sys.path; the pool class is the pipeline's
+_ROOT = str(Path(__file__).resolve().parents[1])
+if _ROOT not in sys.path:
+    sys.path.append(_ROOT)
+from pipeline.pool import RetainingPool
+
+# --- Env loading (local) + Secrets (cloud) ---
+try:
+    from dotenv import load_dotenv  # optional in cloud
+    load_dotenv()
+except Exception:
+    pass
+
+def get_setting(name: str, secret_fallback: bool = True) -> str:
+    """
+    Reads config from environment first; falls back to Streamlit secrets when available.
+    """
+    v = os.getenv(name)
+    if v:
+        return v
+    if secret_fallback:
+        try:
+            return st.secrets[name]
+        except Exception:
+            pass
+    raise RuntimeError(
+        f"Missing required setting: {name}. "
+        f"Set it in .env (local) or Streamlit Secrets (cloud)."
+    )
+
+DB = get_setting("DATABASE_URL")
+
+# Neon's "-pooler" endpoint is PgBouncer in transaction mode: session-level PREPARE
+# does not survive across transactions there, so only prepare on direct connections.
+USE_PREPARED = "-pooler" not in DB
+
+
+class PreparingConnection(PgConnection):
+    """
+    Remembers which named statements were PREPAREd on this server session (name -> sql).
+    Only pays off because RetainingPool keeps the connection (and its session) afterwards.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = {}
+
+
+@st.cache_resource
+def get_pool() -> ThreadedConnectionPool:
+    """
+    One pool per Streamlit server process; avoids a TCP+TLS+auth handshake per query.
+    Connections opened for concurrent sessions/fragment reruns stay pooled afterwards.
+    Keepalives stop Neon from silently dropping idle pooled connections;
+    statement_timeout keeps one slow query from pinning a pooled connection.
+    """
+    return RetainingPool(
+        minconn=1,
+        maxconn=10,
+        dsn=DB,
+        keepalives=1,
+        keepalives_idle=30,
+        application_name="scout-console",
+        options="-c statement_timeout=5000",
+        connection_factory=PreparingConnection,
+    )
+
+
+@contextmanager
+def pooled_cursor():
+    """
+    Borrow one pooled connection + cursor so several queries share it
+    instead of each paying its own checkout.
+    """
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            yield cur
+    finally:
+        pool.putconn(conn)
+
+
+def _numbered(query: str) -> str:
+    # %s placeholders -> $1..$n for PREPARE
+    n = iter(range(1, query.count("%s") + 1))
+    return re.sub(r"%s", lambda _: f"${next(n)}", query)
+
+
+def execute_prepared(cur, name: str, query: str, params=()):
+    """
+    PREPARE `query` once per pooled connection, then EXECUTE it so later renders
+    skip server-side parse/plan. Plain execute when preparing is disabled.
+    """
+    if not USE_PREPARED:
+        cur.execute(query, params)
+        return
+    conn = cur.connection
+    known = conn.prepared.get(name)
+    if known != query:
+        # the pool outlives script edits; re-prepare if this name's SQL changed
+        if known is not None:
+            cur.execute(f"DEALLOCATE {name}")
+        cur.execute(f"PREPARE {name} AS {_numbered(query)}")
+        conn.prepared[name] = query
+    if params:
+        placeholders = ", ".join(["%s"] * len(params))
+        cur.execute(f"EXECUTE {name}({placeholders})", params)
+    else:
+        cur.execute(f"EXECUTE {name}")
+
+
+def q_one(cur, name: str, query: str, params=()):
+    execute_prepared(cur, name, query, params)
+    return cur.fetchone()
+
+
+def q_all(cur, name: str, query: str, params=()):
+    execute_prepared(cur, name, query, params)
+    return cur.fetchall()
+
+
+def q_df(cur, name: str, query: str, params=(), columns=None, dtypes=None) -> pd.DataFrame:
+    """
+    Like q_all, but builds the DataFrame straight from the cursor instead of
+    going through a fetchall() list first. Cached loaders return these frames,
+    so cache hits don't rebuild them on every rerun.
+
+    dtypes: optional {column: dtype}; "datetime" means tz-aware UTC timestamps.
+    Typed columns serialize to Arrow far more compactly than object columns.
+    """
+    execute_prepared(cur, name, query, params)
+    df = pd.DataFrame.from_records(iter(cur), columns=columns, coerce_float=False)
+    for col, dtype in (dtypes or {}).items():
+        if dtype == "datetime":
+            df[col] = pd.to_datetime(df[col], utc=True)
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
@@ -1,27 +1,39 @@
-import os
-import psycopg2
+import json
 import streamlit as st
-from dotenv import load_dotenv
 
-load_dotenv()
-DB = os.environ["DATABASE_URL"]
+from _db import pooled_cursor, q_all, q_df
 
 st.set_page_config(page_title="Changes", layout="wide")
 st.title("Latest changes")
 
-def q_all(query, params=None):
-    conn = psycopg2.connect(DB)
-    try:
-        with conn.cursor() as cur:
-            cur.execute(query, params or ())
-            cols = [d[0] for d in cur.description]
-            rows = cur.fetchall()
-        return cols, rows
-    finally:
-        conn.close()
+
+@st.cache_data(ttl=30, max_entries=256)
+def load_company_options():
+    with pooled_cursor() as cur:
+        return q_all(cur, "company_options", "SELECT company_id::text, name FROM companies ORDER BY name LIMIT 200")
+
+
+@st.cache_data(ttl=30, max_entries=256)
+def load_changes(company_id: str):
+    with pooled_cursor() as cur:
+        return q_df(
+            cur,
+            "changes_by_company",
+            """
+            SELECT detected_at, change_type, object_type, object_id::text, source_url, details
+            FROM changes
+            WHERE company_id=%s::uuid
+            ORDER BY detected_at DESC
+            LIMIT 100
+            """,
+            (company_id,),
+            columns=["detected_at", "change_type", "object_type", "object_id", "source_url", "details"],
+            dtypes={"detected_at": "datetime"},
+        )
+
 
 # Optional filter: choose company
-cols, companies = q_all("SELECT company_id::text, name FROM companies ORDER BY name LIMIT 200")
+companies = load_company_options()
 
 company_map = {name: cid for cid, name in companies}
 picked_name = st.selectbox("Company", options=list(company_map.keys()))
@@ -29,30 +41,32 @@ company_id = company_map[picked_name]
 
 st.caption(f"Company ID: {company_id}")
 
-cols2, rows = q_all(
-    """
-    SELECT detected_at, change_type, object_type, object_id::text, source_url, details
-    FROM changes
-    WHERE company_id=%s::uuid
-    ORDER BY detected_at DESC
-    LIMIT 100
-    """,
-    (company_id,),
-)
-
-if not rows:
+df = load_changes(company_id)
+
+if len(df) == 0:
     st.info("No changes recorded yet. Run the diff job after new upserts.")
 else:
-    for detected_at, change_type, object_type, object_id, source_url, details in rows:
-        left, right = st.columns([3, 2])
-        with left:
-            st.write(f"**{change_type}** — `{object_type}` `{object_id}`")
-            st.write(f"{detected_at}")
-            if details:
-                st.json(details)
-        with right:
-            if source_url:
-                st.link_button("Open source", source_url)
-            else:
-                st.write("No source_url")
-        st.divider()
\ No newline at end of file
+    # details is jsonb (dict); show it compactly in the grid, full view below
+    df_view = df.assign(details=df["details"].map(lambda d: json.dumps(d) if d else ""))
+
+    st.dataframe(
+        df_view,
+        column_config={
+            "source_url": st.column_config.LinkColumn("Source"),
+            "details": st.column_config.TextColumn("Details"),
+        },
+        use_container_width=True,
+        hide_index=True,
+    )
+
+    with st.expander("Change details"):
+        picked = st.selectbox(
+            "Change",
+            options=list(range(len(df))),
+            format_func=lambda i: f"{df.iloc[i]['detected_at']} — {df.iloc[i]['change_type']} {df.iloc[i]['object_id']}",
+        )
+        details = df.iloc[picked]["details"]
+        if details:
+            st.json(details)
+        else:
+            st.write("No details")
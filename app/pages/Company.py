@@ -1,33 +1,184 @@
-import os
-from dotenv import load_dotenv
-import psycopg2
-import pandas as pd
 import streamlit as st
 
-load_dotenv()
-DB = os.environ["DATABASE_URL"]
+from _db import pooled_cursor, q_one, q_df
 
 st.set_page_config(page_title="Company Detail", layout="wide")
 
 
-def q_one(query: str, params=()):
-    conn = psycopg2.connect(DB)
-    try:
-        with conn.cursor() as cur:
-            cur.execute(query, params)
-            return cur.fetchone()
-    finally:
-        conn.close()
+@st.cache_data(ttl=30, max_entries=256)
+def load_company_page(company_id: str):
+    """
+    Page-level reads on one connection/transaction (sources are paged separately).
+    Returns (company, df_people, df_events); company is None if not found.
+    """
+    with pooled_cursor() as cur:
+        company = q_one(
+            cur,
+            "company_by_id",
+            """
+            SELECT company_id::text, name, website, domain, created_at, updated_at
+            FROM companies
+            WHERE company_id = %s::uuid
+            """,
+            (company_id,),
+        )
+        if not company:
+            return None, None, None
+
+        df_people = q_df(
+            cur,
+            "people_by_company",
+            """
+            SELECT person_id::text, name, role, linkedin_url, needs_review, is_final, updated_at
+            FROM people
+            WHERE company_id = %s::uuid
+            ORDER BY is_final DESC, updated_at DESC
+            """,
+            (company_id,),
+            columns=["person_id", "name", "role", "linkedin_url", "needs_review", "is_final", "updated_at"],
+            dtypes={"needs_review": "boolean", "is_final": "boolean", "updated_at": "datetime"},
+        )
+
+        df_events = q_df(
+            cur,
+            "events_by_company",
+            """
+            SELECT event_id::text, event_type::text, event_date, title, summary, needs_review, is_final, updated_at
+            FROM events
+            WHERE company_id = %s::uuid
+            ORDER BY is_final DESC, event_date DESC NULLS LAST, updated_at DESC
+            """,
+            (company_id,),
+            columns=["event_id", "type", "date", "title", "summary", "needs_review", "is_final", "updated_at"],
+            dtypes={"needs_review": "boolean", "is_final": "boolean", "updated_at": "datetime"},
+        )
+
+    return company, df_people, df_events
+
 
+@st.cache_data(ttl=30, max_entries=256)
+def load_sources_page(company_id: str, page: int, page_size: int):
+    """
+    One page of sources plus the company's total source count.
+    Returns (df_sources, total).
+    """
+    with pooled_cursor() as cur:
+        df = q_df(
+            cur,
+            "sources_page_by_company",
+            """
+            SELECT url,
+                   source_type::text,
+                   fetched_at,
+                   LEFT(content_hash, 12) AS h12,
+                   CASE WHEN clean_text IS NULL THEN 0 ELSE LENGTH(clean_text) END AS text_len,
+                   source_id::text,
+                   COUNT(*) OVER () AS total
+            FROM sources
+            WHERE company_id = %s::uuid
+            ORDER BY fetched_at DESC NULLS LAST, source_id
+            LIMIT %s OFFSET %s
+            """,
+            (company_id, page_size, (page - 1) * page_size),
+            columns=["url", "source_type", "fetched_at", "hash12", "text_len", "source_id", "total"],
+            dtypes={"fetched_at": "datetime"},
+        )
+    total = int(df["total"].iat[0]) if len(df) else 0
+    return df.drop(columns="total"), total
 
-def q_all(query: str, params=()):
-    conn = psycopg2.connect(DB)
+
+@st.cache_data(ttl=30, max_entries=256)
+def load_source_preview(source_id: str):
+    with pooled_cursor() as cur:
+        return q_one(
+            cur,
+            "source_preview",
+            "SELECT url, LEFT(clean_text, 4000) FROM sources WHERE source_id=%s::uuid",
+            (source_id,),
+        )
+
+
+@st.cache_data(ttl=30, max_entries=256)
+def load_evidence(object_type: str, object_id: str):
+    with pooled_cursor() as cur:
+        return q_df(
+            cur,
+            "evidence_by_object",
+            """
+            SELECT field, value, url, quote, confidence, extractor_version, created_at
+            FROM evidence
+            WHERE object_type=%s AND object_id=%s::uuid
+            ORDER BY created_at DESC
+            """,
+            (object_type, object_id),
+            columns=["field", "value", "url", "quote", "confidence", "extractor_version", "created_at"],
+            dtypes={"confidence": "float64", "created_at": "datetime"},
+        )
+
+
+SOURCES_PAGE_SIZES = [25, 50, 100, 200]
+
+
+def _query_param_int(key: str, default: int) -> int:
     try:
-        with conn.cursor() as cur:
-            cur.execute(query, params)
-            return cur.fetchall()
-    finally:
-        conn.close()
+        return max(1, int(st.query_params.get(key, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+# Widgets below run as fragments: paging or typing an id reruns only that panel,
+# not the whole page (and its company/sources/people/events loads).
+@st.fragment
+def sources_panel(company_id: str):
+    # page/page_size live in the URL so a paged view can be shared
+    page_size = _query_param_int("sources_page_size", SOURCES_PAGE_SIZES[0])
+    if page_size not in SOURCES_PAGE_SIZES:
+        page_size = SOURCES_PAGE_SIZES[0]
+
+    c1, c2 = st.columns([1, 1])
+    with c2:
+        page_size = st.selectbox("Rows per page", SOURCES_PAGE_SIZES, index=SOURCES_PAGE_SIZES.index(page_size))
+    with c1:
+        page = st.number_input("Page", min_value=1, value=_query_param_int("sources_page", 1), step=1)
+
+    st.query_params["sources_page"] = str(page)
+    st.query_params["sources_page_size"] = str(page_size)
+
+    df_sources, total = load_sources_page(company_id, int(page), int(page_size))
+
+    st.dataframe(df_sources, use_container_width=True, hide_index=True)
+    if len(df_sources):
+        first = (page - 1) * page_size + 1
+        st.caption(f"Showing {first}–{first + len(df_sources) - 1} of {total}")
+    elif page > 1:
+        st.caption("No sources on this page.")
+
+
+@st.fragment
+def source_preview_panel():
+    src_pick = st.text_input("source_id (to preview clean_text)", value="")
+    if src_pick:
+        row = load_source_preview(src_pick)
+        if not row:
+            st.warning("source_id not found.")
+        else:
+            u, preview = row
+            st.write(f"**URL:** {u}")
+            st.code(preview or "", language="text")
+            st.caption("Preview shows first 4000 chars.")
+
+
+@st.fragment
+def evidence_panel(object_type: str):
+    article = "an" if object_type[0] in "aeiou" else "a"
+    st.caption(f"View evidence for {article} {object_type} (paste {object_type}_id):")
+    pick = st.text_input(f"{object_type}_id", value="")
+    if pick:
+        df_ev = load_evidence(object_type, pick)
+        if len(df_ev) == 0:
+            st.warning(f"No evidence for that {object_type}_id.")
+        else:
+            st.dataframe(df_ev, use_container_width=True, hide_index=True)
 
 
 st.title("Company Detail")
@@ -43,14 +194,7 @@ if not company_id:
     st.stop()
 
 # --- Company metadata ---
-company = q_one(
-    """
-    SELECT company_id::text, name, website, domain, created_at, updated_at
-    FROM companies
-    WHERE company_id = %s::uuid
-    """,
-    (company_id,),
-)
+company, df_people, df_events = load_company_page(company_id)
 
 if not company:
     st.error("Company not found.")
@@ -73,125 +217,31 @@ st.divider()
 # --- Sources ---
 st.subheader("Sources fetched")
 
-sources_rows = q_all(
-    """
-    SELECT url,
-           source_type::text,
-           fetched_at,
-           LEFT(content_hash, 12) AS h12,
-           CASE WHEN clean_text IS NULL THEN 0 ELSE LENGTH(clean_text) END AS text_len,
-           source_id::text
-    FROM sources
-    WHERE company_id = %s::uuid
-    ORDER BY fetched_at DESC NULLS LAST
-    """,
-    (company_id,),
-)
-
-df_sources = pd.DataFrame(
-    sources_rows,
-    columns=["url", "source_type", "fetched_at", "hash12", "text_len", "source_id"],
-)
-
-st.dataframe(df_sources, use_container_width=True, hide_index=True)
+sources_panel(company_id)
 
 with st.expander("Peek clean_text for a source (optional)"):
-    src_pick = st.text_input("source_id (to preview clean_text)", value="")
-    if src_pick:
-        row = q_one(
-            "SELECT url, LEFT(clean_text, 4000) FROM sources WHERE source_id=%s::uuid",
-            (src_pick,),
-        )
-        if not row:
-            st.warning("source_id not found.")
-        else:
-            u, preview = row
-            st.write(f"**URL:** {u}")
-            st.code(preview or "", language="text")
-            st.caption("Preview shows first 4000 chars.")
+    source_preview_panel()
 
 st.divider()
 
 # --- People ---
 st.subheader("Founders / Team")
 
-people_rows = q_all(
-    """
-    SELECT person_id::text, name, role, linkedin_url, needs_review, is_final, updated_at
-    FROM people
-    WHERE company_id = %s::uuid
-    ORDER BY is_final DESC, updated_at DESC
-    """,
-    (company_id,),
-)
-
-df_people = pd.DataFrame(
-    people_rows,
-    columns=["person_id", "name", "role", "linkedin_url", "needs_review", "is_final", "updated_at"],
-)
-
 if len(df_people) == 0:
     st.info("No people yet. Run extraction + upsert to populate.")
 else:
     st.dataframe(df_people, use_container_width=True, hide_index=True)
 
-st.caption("View evidence for a person (paste person_id):")
-person_pick = st.text_input("person_id", value="")
-if person_pick:
-    ev = q_all(
-        """
-        SELECT field, value, url, quote, confidence, extractor_version, created_at
-        FROM evidence
-        WHERE object_type='person' AND object_id=%s::uuid
-        ORDER BY created_at DESC
-        """,
-        (person_pick,),
-    )
-    df_ev = pd.DataFrame(ev, columns=["field", "value", "url", "quote", "confidence", "extractor_version", "created_at"])
-    if len(df_ev) == 0:
-        st.warning("No evidence for that person_id.")
-    else:
-        st.dataframe(df_ev, use_container_width=True, hide_index=True)
+evidence_panel("person")
 
 st.divider()
 
 # --- Events ---
 st.subheader("Events")
 
-events_rows = q_all(
-    """
-    SELECT event_id::text, event_type::text, event_date, title, summary, needs_review, is_final, updated_at
-    FROM events
-    WHERE company_id = %s::uuid
-    ORDER BY is_final DESC, event_date DESC NULLS LAST, updated_at DESC
-    """,
-    (company_id,),
-)
-
-df_events = pd.DataFrame(
-    events_rows,
-    columns=["event_id", "type", "date", "title", "summary", "needs_review", "is_final", "updated_at"],
-)
-
 if len(df_events) == 0:
     st.info("No events yet. Run extraction + upsert to populate.")
 else:
     st.dataframe(df_events, use_container_width=True, hide_index=True)
 
-st.caption("View evidence for an event (paste event_id):")
-event_pick = st.text_input("event_id", value="")
-if event_pick:
-    ev = q_all(
-        """
-        SELECT field, value, url, quote, confidence, extractor_version, created_at
-        FROM evidence
-        WHERE object_type='event' AND object_id=%s::uuid
-        ORDER BY created_at DESC
-        """,
-        (event_pick,),
-    )
-    df_ev = pd.DataFrame(ev, columns=["field", "value", "url", "quote", "confidence", "extractor_version", "created_at"])
-    if len(df_ev) == 0:
-        st.warning("No evidence for that event_id.")
-    else:
-        st.dataframe(df_ev, use_container_width=True, hide_index=True)
\ No newline at end of file
+evidence_panel("event")
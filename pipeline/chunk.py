@@ -1,6 +1,53 @@
-from typing import List, Dict
+import re
+from dataclasses import dataclass, field
+from typing import Iterator, List
 
-def chunk_text(clean_text: str, max_chars: int = 2400, max_chunks_per_source: int = 3) -> List[Dict]:
+# every line boundary str.splitlines() recognizes, folded to "\n" before splitting
+_NEWLINE_RE = re.compile(r"\r\n|[\r\x0b\x0c\x1c-\x1e\x85\u2028\u2029]")
+# blank line(s) separate paragraphs; single line breaks (with surrounding spaces) join lines
+_PARA_RE = re.compile(r"\n\s*\n")
+_LINEBREAK_RE = re.compile(r"\s*\n\s*")
+_WS_RE = re.compile(r"\s+")
+
+
+@dataclass(frozen=True)
+class Chunk:
+    """
+    One chunk of a source's clean_text. The whitespace-folded and lowercased
+    forms are computed once here, so triage doesn't re-walk the text;
+    validation and extraction use `raw`.
+    """
+    idx: int
+    heading: str
+    raw: str
+    normalized: str = field(init=False, repr=False)
+    lower: str = field(init=False, repr=False)
+
+    def __post_init__(self):
+        normalized = _WS_RE.sub(" ", self.raw).strip()
+        object.__setattr__(self, "normalized", normalized)
+        object.__setattr__(self, "lower", normalized.lower())
+
+    def __len__(self) -> int:
+        return len(self.normalized)
+
+
+def _iter_paragraphs(text: str) -> Iterator[str]:
+    """
+    Yields non-empty paragraphs (blank-line separated), each folded onto one line.
+    """
+    start = 0
+    for m in _PARA_RE.finditer(text):
+        p = _LINEBREAK_RE.sub(" ", text[start:m.start()].strip())
+        if p:
+            yield p
+        start = m.end()
+    p = _LINEBREAK_RE.sub(" ", text[start:].strip())
+    if p:
+        yield p
+
+
+def chunk_text(clean_text: str, max_chars: int = 2400, max_chunks_per_source: int = 3) -> List[Chunk]:
     """
     Robust chunking:
     - Splits by blank lines into paragraphs
@@ -11,23 +58,10 @@ def chunk_text(clean_text: str, max_chars: int = 2400, max_chunks_per_source: in
     if len(text) < 200:
         return []
 
-    # paragraphs
-    paras = []
-    buf = []
-    for line in text.splitlines():
-        ln = line.strip()
-        if not ln:
-            if buf:
-                paras.append(" ".join(buf).strip())
-                buf = []
-            continue
-        buf.append(ln)
-    if buf:
-        paras.append(" ".join(buf).strip())
-
-    if not paras:
-        # fallback: whole text as one "paragraph"
-        paras = [text]
+    # paragraphs are produced lazily: packing stops at max_chunks_per_source,
+    # so the rest of a long page is never split or folded.
+    # (text is stripped and >= 200 chars, so there is always at least one paragraph)
+    paras = _iter_paragraphs(_NEWLINE_RE.sub("\n", text))
 
     chunks = []
     cur = []
@@ -51,14 +85,16 @@ def chunk_text(clean_text: str, max_chars: int = 2400, max_chunks_per_source: in
         if cur_len + len(p) + 2 > max_chars and cur:
             flush()
 
-        # if single paragraph is huge, hard-split
+        # if single paragraph is huge, hard-split (only as many pieces as we can still keep)
         if len(p) > max_chars:
             start = 0
-            while start < len(p):
-                part = p[start:start + max_chars]
-                if part.strip():
-                    chunks.append(part.strip())
+            while start < len(p) and len(chunks) < max_chunks_per_source:
+                part = p[start:start + max_chars].strip()
+                if part:
+                    chunks.append(part)
                 start += max_chars
+            if len(chunks) >= max_chunks_per_source:
+                break
             continue
 
         cur.append(p)
@@ -73,14 +109,16 @@ def chunk_text(clean_text: str, max_chars: int = 2400, max_chunks_per_source: in
     if not chunks:
         chunks = [text[:max_chars]]
 
-    # build heading+text objects
+    chunks = chunks[:max_chunks_per_source]
+
+    # build heading+text chunks
     out = []
-    for i, c in enumerate(chunks[:max_chunks_per_source], 1):
+    for i, c in enumerate(chunks, 1):
         heading = "BODY"
         # heuristic: if first line is short, treat as heading-ish
-        first_line = c.splitlines()[0].strip() if c.splitlines() else ""
+        first_line = c.split("\n", 1)[0].strip() if c else ""
         if 0 < len(first_line) <= 80:
             heading = first_line
-        out.append({"idx": i, "heading": heading, "text": c})
+        out.append(Chunk(i, heading, c))
 
     return out
\ No newline at end of file
@@ -0,0 +1,72 @@
+import os
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+from psycopg2.pool import ThreadedConnectionPool
+from dotenv import load_dotenv
+
+from pipeline.pool import RetainingPool
+
+load_dotenv()
+DB = os.environ["DATABASE_URL"]
+
+# fetch_pending runs up to FETCH_CONCURRENCY DB calls at once from worker threads
+MAX_CONN = int(os.environ.get("DB_POOL_MAX", "16"))
+
+
+_pool: Optional[ThreadedConnectionPool] = None
+_pool_lock = threading.Lock()
+# ThreadedConnectionPool raises PoolError when exhausted; this makes callers wait instead
+_slots = threading.BoundedSemaphore(MAX_CONN)
+
+
+def get_pool() -> ThreadedConnectionPool:
+    """
+    One pool per process, created on first use (importing a pipeline module doesn't connect).
+    run_20's worker processes are reused across companies and RetainingPool keeps every
+    connection their steps open, so connections live for the whole batch; keepalives
+    stop Neon from silently dropping idle ones while a step is busy elsewhere.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = RetainingPool(
+                    1,
+                    MAX_CONN,
+                    DB,
+                    keepalives=1,
+                    keepalives_idle=30,
+                    application_name="scout-pipeline",
+                )
+    return _pool
+
+
+@contextmanager
+def get_conn():
+    """
+    Borrow a pooled connection instead of paying TCP+TLS+auth per psycopg2.connect().
+    Drop-in for `conn = psycopg2.connect(DB); try: ... finally: conn.close()`:
+    `with conn:` transactions work as before, and an open transaction is rolled back
+    when the connection goes back to the pool.
+    """
+    with _slots:
+        pool = get_pool()
+        conn = pool.getconn()
+        try:
+            yield conn
+        finally:
+            pool.putconn(conn, close=bool(conn.closed))
+
+
+def close_pool() -> None:
+    """
+    Close every pooled connection; the next get_conn() builds a fresh pool.
+    Call before forking workers so children never share the parent's sockets.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
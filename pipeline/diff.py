@@ -1,58 +1,71 @@
-import os
 from typing import Optional, Dict, Any, List, Tuple
 
-import psycopg2
-from dotenv import load_dotenv
+from psycopg2.extras import Json, execute_values
 
-load_dotenv()
-DB = os.environ["DATABASE_URL"]
+from pipeline.db import get_conn
 
 
-def _best_source_url_for_object(cur, object_type: str, object_id: str) -> Optional[str]:
+def _best_url_lateral(object_type: str, id_expr: str) -> str:
     """
-    Evidence-first: pick the most recent evidence url for that object.
-    Assumes evidence has object_type/object_id + url column.
+    Evidence-first: LATERAL subquery picking the most recent evidence url for each row,
+    so candidates come back with their source url in one round-trip.
+    object_type is an internal literal (never user input).
     """
-    try:
-        cur.execute(
-            """
+    return f"""
+        LEFT JOIN LATERAL (
             SELECT url
             FROM evidence
-            WHERE object_type=%s AND object_id=%s::uuid AND url IS NOT NULL
+            WHERE object_type='{object_type}' AND object_id={id_expr} AND url IS NOT NULL
             ORDER BY created_at DESC
             LIMIT 1
-            """,
-            (object_type, object_id),
-        )
-        row = cur.fetchone()
-        return row[0] if row else None
-    except Exception:
-        return None
+        ) ev ON true
+    """
 
 
-def _insert_change(
-    cur,
+def _change_row(
     company_id: str,
     change_type: str,
     object_type: str,
     object_id: str,
     source_url: Optional[str],
     details: Optional[Dict[str, Any]] = None,
-) -> bool:
-    cur.execute(
+) -> Tuple:
+    return (company_id, change_type, object_type, object_id, source_url, None if details is None else Json(details))
+
+
+def _flush_changes(cur, rows: List[Tuple]) -> int:
+    """
+    Inserts all pending change rows in one statement (execute_values pages at 100 rows).
+    Returns how many were actually inserted (conflicts are skipped, not returned).
+    """
+    if not rows:
+        return 0
+    inserted = execute_values(
+        cur,
         """
         INSERT INTO changes(company_id, change_type, object_type, object_id, source_url, details)
-        VALUES (%s::uuid, %s, %s, %s::uuid, %s, %s::jsonb)
+        VALUES %s
         ON CONFLICT DO NOTHING
+        RETURNING 1
         """,
-        (company_id, change_type, object_type, object_id, source_url, None if details is None else __import__("json").dumps(details)),
+        rows,
+        template="(%s::uuid, %s, %s, %s::uuid, %s, %s::jsonb)",
+        fetch=True,
     )
-    return (cur.rowcount or 0) == 1
+    return len(inserted)
+
+
+def get_watermark(cur, company_id: str):
+    """
+    Last diff time for the company (uses changes(company_id, detected_at DESC)).
+    """
+    cur.execute("SELECT COALESCE(MAX(detected_at), '1970-01-01') FROM changes WHERE company_id=%s::uuid", (company_id,))
+    return cur.fetchone()[0]
 
 
 # ---------------- People changes ----------------
 
-def detect_people_changes(cur, company_id: str) -> int:
+def detect_people_changes(cur, company_id: str, watermark) -> int:
     """
     MVP logic:
       - new person inserted since last diff run => change
@@ -63,37 +76,41 @@ def detect_people_changes(cur, company_id: str) -> int:
     Assumptions:
       people table has: person_id, company_id, name, role, updated_at, created_at
     """
-    # watermark
-    cur.execute("SELECT COALESCE(MAX(detected_at), '1970-01-01') FROM changes WHERE company_id=%s::uuid", (company_id,))
-    watermark = cur.fetchone()[0]
+    pending: List[Tuple] = []
 
     # 1) new people (created after watermark)
-    new_count = 0
     try:
         cur.execute(
-            """
-            SELECT person_id::text
-            FROM people
-            WHERE company_id=%s::uuid AND created_at > %s
+            f"""
+            SELECT p.person_id::text, ev.url
+            FROM people p
+            {_best_url_lateral("person", "p.person_id")}
+            WHERE p.company_id=%s::uuid AND p.created_at > %s
             """,
             (company_id, watermark),
         )
-        for (person_id,) in cur.fetchall():
-            url = _best_source_url_for_object(cur, "person", person_id)
-            if _insert_change(cur, company_id, "new_person", "person", person_id, url, None):
-                new_count += 1
+        for person_id, url in cur.fetchall():
+            pending.append(_change_row(company_id, "new_person", "person", person_id, url, None))
     except Exception:
         # If created_at doesn't exist, skip "new" detection.
         pass
 
-    # 2) role updates (updated after watermark)
-    upd_count = 0
+    # 2) role updates (updated after watermark), with last recorded role change per person
     try:
         cur.execute(
-            """
-            SELECT person_id::text, role
-            FROM people
-            WHERE company_id=%s::uuid AND updated_at > %s
+            f"""
+            SELECT p.person_id::text, p.role, last_change.details->>'to', ev.url
+            FROM people p
+            LEFT JOIN LATERAL (
+                SELECT details
+                FROM changes c
+                WHERE c.company_id=p.company_id AND c.object_type='person' AND c.object_id=p.person_id
+                  AND c.change_type='updated_role'
+                ORDER BY c.detected_at DESC
+                LIMIT 1
+            ) last_change ON true
+            {_best_url_lateral("person", "p.person_id")}
+            WHERE p.company_id=%s::uuid AND p.updated_at > %s
             """,
             (company_id, watermark),
         )
@@ -101,115 +118,82 @@ def detect_people_changes(cur, company_id: str) -> int:
     except Exception:
         candidates = []
 
-    for person_id, role in candidates:
-        # Compare with last recorded role change for this person
-        cur.execute(
-            """
-            SELECT details
-            FROM changes
-            WHERE company_id=%s::uuid AND object_type='person' AND object_id=%s::uuid
-              AND change_type='updated_role'
-            ORDER BY detected_at DESC
-            LIMIT 1
-            """,
-            (company_id, person_id),
-        )
-        row = cur.fetchone()
-        last_to = None
-        if row and row[0]:
-            try:
-                last_to = row[0].get("to")
-            except Exception:
-                last_to = None
-
+    for person_id, role, last_to, url in candidates:
         # If we never recorded, we still want to detect role change vs previous people snapshot
         # We'll pull previous role from an earlier people state by looking at evidence is too heavy.
         # MVP: if last_to exists and differs, record. If last_to absent, record update event once.
         if last_to is None:
-            url = _best_source_url_for_object(cur, "person", person_id)
-            if _insert_change(cur, company_id, "updated_role", "person", person_id, url, {"field": "role", "from": None, "to": role}):
-                upd_count += 1
+            pending.append(_change_row(company_id, "updated_role", "person", person_id, url, {"field": "role", "from": None, "to": role}))
         else:
             if (role or "") != (last_to or ""):
-                url = _best_source_url_for_object(cur, "person", person_id)
-                if _insert_change(cur, company_id, "updated_role", "person", person_id, url, {"field": "role", "from": last_to, "to": role}):
-                    upd_count += 1
+                pending.append(_change_row(company_id, "updated_role", "person", person_id, url, {"field": "role", "from": last_to, "to": role}))
 
-    return new_count + upd_count
+    return _flush_changes(cur, pending)
 
 
 # ---------------- Events changes ----------------
 
-def detect_event_changes(cur, company_id: str) -> int:
+def detect_event_changes(cur, company_id: str, watermark) -> int:
     """
     new event inserted since watermark => change.
     Assumes events table has: event_id, company_id, created_at
     """
-    cur.execute("SELECT COALESCE(MAX(detected_at), '1970-01-01') FROM changes WHERE company_id=%s::uuid", (company_id,))
-    watermark = cur.fetchone()[0]
-
-    count = 0
+    pending: List[Tuple] = []
     try:
         cur.execute(
-            """
-            SELECT event_id::text
-            FROM events
-            WHERE company_id=%s::uuid AND created_at > %s
+            f"""
+            SELECT e.event_id::text, ev.url
+            FROM events e
+            {_best_url_lateral("event", "e.event_id")}
+            WHERE e.company_id=%s::uuid AND e.created_at > %s
             """,
             (company_id, watermark),
         )
-        for (event_id,) in cur.fetchall():
-            url = _best_source_url_for_object(cur, "event", event_id)
-            if _insert_change(cur, company_id, "new_event", "event", event_id, url, None):
-                count += 1
+        for event_id, url in cur.fetchall():
+            pending.append(_change_row(company_id, "new_event", "event", event_id, url, None))
     except Exception:
         pass
-    return count
+    return _flush_changes(cur, pending)
 
 
 # ---------------- Funding changes (optional) ----------------
 
-def detect_funding_changes(cur, company_id: str) -> int:
+def detect_funding_changes(cur, company_id: str, watermark) -> int:
     """
     If you have funding_rounds table: new rows since watermark => change.
     """
-    cur.execute("SELECT COALESCE(MAX(detected_at), '1970-01-01') FROM changes WHERE company_id=%s::uuid", (company_id,))
-    watermark = cur.fetchone()[0]
-
-    count = 0
+    pending: List[Tuple] = []
     try:
         cur.execute(
-            """
-            SELECT funding_round_id::text
-            FROM funding_rounds
-            WHERE company_id=%s::uuid AND created_at > %s
+            f"""
+            SELECT fr.funding_round_id::text, ev.url
+            FROM funding_rounds fr
+            {_best_url_lateral("funding_round", "fr.funding_round_id")}
+            WHERE fr.company_id=%s::uuid AND fr.created_at > %s
             """,
             (company_id, watermark),
         )
-        for (fr_id,) in cur.fetchall():
-            url = _best_source_url_for_object(cur, "funding_round", fr_id)
-            if _insert_change(cur, company_id, "new_funding_round", "funding_round", fr_id, url, None):
-                count += 1
+        for fr_id, url in cur.fetchall():
+            pending.append(_change_row(company_id, "new_funding_round", "funding_round", fr_id, url, None))
     except Exception:
         # table not present is ok
         pass
-    return count
+    return _flush_changes(cur, pending)
 
 
 def run_diff(company_id: str) -> Dict[str, int]:
-    conn = psycopg2.connect(DB)
     stats = {"people": 0, "events": 0, "funding_rounds": 0, "total": 0}
-    try:
+    with get_conn() as conn:
         with conn:
             with conn.cursor() as cur:
-                p = detect_people_changes(cur, company_id)
-                e = detect_event_changes(cur, company_id)
-                f = detect_funding_changes(cur, company_id)
+                # one watermark for all detectors, read before any of them inserts changes
+                watermark = get_watermark(cur, company_id)
+                p = detect_people_changes(cur, company_id, watermark)
+                e = detect_event_changes(cur, company_id, watermark)
+                f = detect_funding_changes(cur, company_id, watermark)
 
                 stats["people"] = p
                 stats["events"] = e
                 stats["funding_rounds"] = f
                 stats["total"] = p + e + f
-    finally:
-        conn.close()
     return stats
\ No newline at end of file
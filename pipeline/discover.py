@@ -1,15 +1,20 @@
 import os
 import re
 import sys
+from functools import lru_cache
 from typing import List, Dict, Tuple, Optional
 from urllib.parse import urlparse, urljoin, urlunparse
 
 import httpx
-import psycopg2
+import lxml.html
+from lxml import etree
+from psycopg2.extras import execute_values
 from dotenv import load_dotenv
 
+from pipeline.db import get_conn
+from pipeline.normalize import URL_JUNK, split_http_url
+
 load_dotenv()
-DB = os.environ["DATABASE_URL"]
 
 UA = "ScoutBot/0.1 (+evidence-first; contact: internal)"
 TIMEOUT = 20.0
@@ -27,14 +32,22 @@ except Exception:
 # ----------------------------
 # URL utilities
 # ----------------------------
+_SCHEME_RE = re.compile(r"^https?://", re.I)
+_WWW_RE = re.compile(r"^www\.")
+
+
+# normalize_domain / canonicalize_url are pure, and the same inputs recur across
+# crawl, merge and same-domain checks, so both are memoized
+@lru_cache(maxsize=4096)
 def normalize_domain(domain: str) -> str:
     d = (domain or "").strip().lower()
-    d = re.sub(r"^https?://", "", d)
-    d = re.sub(r"^www\.", "", d)
+    d = _SCHEME_RE.sub("", d)
+    d = _WWW_RE.sub("", d)
     d = d.split("/")[0]
     return d
 
 
+@lru_cache(maxsize=4096)
 def canonicalize_url(url: str) -> str:
     """
     Basic canonicalization:
@@ -46,31 +59,33 @@ def canonicalize_url(url: str) -> str:
     if not u:
         return ""
 
-    if not re.match(r"^https?://", u, flags=re.I):
+    if not _SCHEME_RE.match(u):
         u = "https://" + u
+    u = u.translate(URL_JUNK)
 
-    p = urlparse(u)
-    scheme = p.scheme.lower()
-    netloc = p.netloc.lower()
-    netloc = re.sub(r"^www\.", "", netloc)
-
-    path = p.path or "/"
-    # remove fragments
-    fragment = ""
-    query = p.query or ""
+    scheme, netloc, path, query = split_http_url(u)
+    scheme = scheme.lower()
+    netloc = _WWW_RE.sub("", netloc.lower())
 
+    path = path or "/"
     # normalize trailing slash
     if path != "/" and path.endswith("/"):
         path = path[:-1]
+    if not netloc and path.startswith("//"):
+        # urlunparse would read the leading "//" as an authority; keep its output
+        return urlunparse((scheme, netloc, path, "", query, ""))
 
-    return urlunparse((scheme, netloc, path, "", query, fragment))
+    return f"{scheme}://{netloc}{path}?{query}" if query else f"{scheme}://{netloc}{path}"
 
 
 def is_same_domain(url: str, domain: str) -> bool:
     d = normalize_domain(domain)
     try:
-        p = urlparse(url)
-        host = re.sub(r"^www\.", "", (p.netloc or "").lower())
+        if _SCHEME_RE.match(url):
+            netloc = split_http_url(url.translate(URL_JUNK))[1]
+        else:
+            netloc = urlparse(url).netloc
+        host = _WWW_RE.sub("", (netloc or "").lower())
         return host == d or host.endswith("." + d)
     except Exception:
         return False
@@ -94,38 +109,45 @@ def q_all(conn, query: str, params: tuple) -> List[tuple]:
 def insert_sources(conn, company_id: str, rows: List[Tuple[str, str]]) -> int:
     """
     rows: list of (url, source_type)
-    Inserts with ON CONFLICT(company_id,url) DO NOTHING
+    Inserts all rows in one statement with ON CONFLICT(company_id,url) DO NOTHING.
+    Returns how many were new (RETURNING only yields inserted rows).
     """
-    if not rows:
+    # url -> source_type; first occurrence wins, so callers' priority order is kept
+    by_url = {}
+    for url, source_type in rows:
+        if url and url not in by_url:
+            by_url[url] = source_type
+    if not by_url:
         return 0
+    values = [(company_id, url, source_type) for url, source_type in by_url.items()]
 
-    inserted = 0
     with conn:
         with conn.cursor() as cur:
-            for url, source_type in rows:
-                if not url:
-                    continue
-
-                cur.execute(
-                    """
-                    INSERT INTO sources(company_id, url, source_type, fetched_at, content_hash, clean_text)
-                    VALUES (%s::uuid, %s, %s, NULL, NULL, NULL)
-                    ON CONFLICT(company_id, url) DO NOTHING
-                    """,
-                    # If enum: use %s::source_type_enum
-                    (company_id, url, source_type),
-                )
-                # rowcount is 1 if inserted
-                if cur.rowcount == 1:
-                    inserted += 1
-
-    return inserted
+            inserted = execute_values(
+                cur,
+                """
+                INSERT INTO sources(company_id, url, source_type, fetched_at, content_hash, clean_text)
+                VALUES %s
+                ON CONFLICT(company_id, url) DO NOTHING
+                RETURNING 1
+                """,
+                values,
+                # If enum: use %s::source_type_enum
+                template="(%s::uuid, %s, %s, NULL, NULL, NULL)",
+                page_size=len(values),  # one multi-VALUES statement, not one per 100 rows
+                fetch=True,
+            )
+
+    return len(inserted)
 
 
 # ----------------------------
 # Fetch homepage + crawl
 # ----------------------------
-def fetch_homepage_html(base_url: str) -> str:
+def fetch_homepage_html(base_url: str) -> bytes:
+    """
+    Raw body bytes (b"" on failure); lxml sniffs the charset itself, so no str decode here.
+    """
     headers = {
         "User-Agent": UA,
         "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
@@ -135,37 +157,47 @@ def fetch_homepage_html(base_url: str) -> str:
     }
 
     try:
-        with httpx.Client(timeout=TIMEOUT, follow_redirects=True, headers=headers) as client:
+        with httpx.Client(timeout=TIMEOUT, follow_redirects=True, headers=headers, http2=True) as client:
             r = client.get(base_url)
             r.raise_for_status()
-            return r.text
+            return r.content
     except (httpx.ConnectError, httpx.ReadError, httpx.TimeoutException) as e:
         print(f"[discover] SKIP_HOME_CONNECT base={base_url} err={type(e).__name__}: {e}")
-        return ""
+        return b""
     except httpx.HTTPStatusError as e:
         status = e.response.status_code if e.response else None
         print(f"[discover] SKIP_HOME_HTTP base={base_url} status={status}")
-        return ""
+        return b""
     except Exception as e:
         print(f"[discover] SKIP_HOME_OTHER base={base_url} err={type(e).__name__}: {e}")
-        return ""
-
+        return b""
 
-ANCHOR_RE = re.compile(r'href=[\'"]([^\'"]+)[\'"]', re.I)
 
-KEYWORDS = re.compile(r"(about|team|company|press|news|blog|careers|investor|funding)", re.I)
+# keyword anywhere in the *path* of a canonical url (scheme://host/path[?query]); matching the
+# whole url in one pass skips a per-link urlparse, and anchoring past the host keeps e.g.
+# "newsroom.io" from matching on its domain
+KEYWORDS_PATH_RE = re.compile(
+    r"^[^:/?#]+://[^/?#]*/[^?#]*(about|team|company|press|news|blog|careers|investor|funding)",
+    re.I,
+)
 
 
-def crawl_homepage_links(homepage_html: str, base_url: str, domain: str, max_links: int = 30) -> List[str]:
+def crawl_homepage_links(homepage_html: bytes, base_url: str, domain: str, max_links: int = 30) -> List[str]:
     """
-    Very lightweight crawl: parse hrefs from HTML and pick same-domain links containing keywords.
+    Very lightweight crawl: parse <a href> from HTML and pick same-domain links containing keywords.
     """
     if not homepage_html:
         return []
 
+    # structural parse (C-backed): handles any attribute quoting and ignores script/style text
+    try:
+        hrefs = lxml.html.fromstring(homepage_html).xpath("//a[@href]/@href")
+    except (etree.ParserError, ValueError):
+        return []
+
     found = []
-    for m in ANCHOR_RE.finditer(homepage_html):
-        href = m.group(1).strip()
+    for href in hrefs:
+        href = href.strip()
         if not href:
             continue
         if href.startswith("#") or href.startswith("mailto:") or href.startswith("tel:"):
@@ -179,11 +211,7 @@ def crawl_homepage_links(homepage_html: str, base_url: str, domain: str, max_lin
             continue
 
         # must contain keywords in path
-        try:
-            p = urlparse(abs_url)
-            if not KEYWORDS.search(p.path):
-                continue
-        except Exception:
+        if not KEYWORDS_PATH_RE.match(abs_url):
             continue
 
         found.append(abs_url)
@@ -274,8 +302,7 @@ Rules:
 # Main
 # ----------------------------
 def discover_sources(company_id: str) -> None:
-    conn = psycopg2.connect(DB)
-    try:
+    with get_conn() as conn:
         row = q_one(
             conn,
             "SELECT name, website, domain FROM companies WHERE company_id=%s::uuid",
@@ -311,9 +338,11 @@ def discover_sources(company_id: str) -> None:
         # 3) AI urls (optional)
         ai = propose_urls_ai(name or domain, domain)
 
-        # merge + dedupe with priority order: deterministic -> crawled -> ai
+        # merge + dedupe with priority order: deterministic -> crawled -> ai;
+        # urls already stored for this company are skipped client-side so re-runs send only new rows
         merged: List[Tuple[str, str]] = []
-        seen = set()
+        seen = {u for (u,) in q_all(conn, "SELECT url FROM sources WHERE company_id=%s::uuid", (company_id,))}
+        existing = len(seen)
 
         def add_many(rows):
             for u, st in rows:
@@ -332,7 +361,7 @@ def discover_sources(company_id: str) -> None:
         # Insert
         inserted = insert_sources(conn, company_id, merged)
 
-        print(f"[discover] deterministic={len(det)} crawled={len(crawled)} ai={len(ai)}")
+        print(f"[discover] deterministic={len(det)} crawled={len(crawled)} ai={len(ai)} already_stored={existing}")
         print(f"[discover] queued_sources_inserted={inserted}")
 
         # sample
@@ -340,9 +369,6 @@ def discover_sources(company_id: str) -> None:
         for u, st in merged[:10]:
             print(f"  - {st}: {u}")
 
-    finally:
-        conn.close()
-
 
 def main():
     if len(sys.argv) < 2:
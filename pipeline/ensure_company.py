@@ -1,13 +1,13 @@
-import os
 import re
 import sys
+from typing import List, Tuple
 from urllib.parse import urlparse
 
-import psycopg2
-from dotenv import load_dotenv
+from psycopg2.extras import execute_values
 
-load_dotenv()
-DB = os.environ["DATABASE_URL"]
+from pipeline.db import get_conn
+
+_WWW_RE = re.compile(r"^www\.")
 
 def norm_domain(website: str) -> str:
     if not website:
@@ -16,13 +16,12 @@ def norm_domain(website: str) -> str:
         website = "https://" + website
     p = urlparse(website)
     d = (p.netloc or "").lower()
-    d = re.sub(r"^www\.", "", d)
+    d = _WWW_RE.sub("", d)
     return d
 
 def ensure_company(name: str, website: str) -> str:
     domain = norm_domain(website)
-    conn = psycopg2.connect(DB)
-    try:
+    with get_conn() as conn:
         with conn:
             with conn.cursor() as cur:
                 # upsert by domain if present else by name
@@ -47,8 +46,64 @@ def ensure_company(name: str, website: str) -> str:
                         (name, website, domain),
                     )
                 return cur.fetchone()[0]
-    finally:
-        conn.close()
+
+def ensure_companies(rows: List[Tuple[str, str]]) -> List[str]:
+    """
+    ensure_company for many (name, website) rows: one upsert for every row with a
+    domain, one insert for the rest. Returns company_ids aligned with `rows`.
+    """
+    by_domain = {}  # domain -> (name, website); later rows win, as sequential upserts would
+    no_domain = []  # index into rows
+    domains = []
+    for i, (name, website) in enumerate(rows):
+        domain = norm_domain(website)
+        domains.append(domain)
+        if domain:
+            by_domain[domain] = (name, website)
+        else:
+            no_domain.append(i)
+
+    ids = [None] * len(rows)
+    with get_conn() as conn:
+        with conn:
+            with conn.cursor() as cur:
+                if by_domain:
+                    values = [(name, website, domain) for domain, (name, website) in by_domain.items()]
+                    returned = execute_values(
+                        cur,
+                        """
+                        INSERT INTO companies(name, website, domain)
+                        VALUES %s
+                        ON CONFLICT(domain)
+                        DO UPDATE SET name=EXCLUDED.name, website=EXCLUDED.website, updated_at=now()
+                        RETURNING domain, company_id::text
+                        """,
+                        values,
+                        page_size=len(values),
+                        fetch=True,
+                    )
+                    cid_by_domain = dict(returned)
+                    for i, domain in enumerate(domains):
+                        if domain:
+                            ids[i] = cid_by_domain[domain]
+
+                if no_domain:
+                    values = [rows[i] + ("",) for i in no_domain]
+                    returned = execute_values(
+                        cur,
+                        """
+                        INSERT INTO companies(name, website, domain)
+                        VALUES %s
+                        RETURNING company_id::text
+                        """,
+                        values,
+                        page_size=len(values),
+                        fetch=True,
+                    )
+                    # one new row per input, in VALUES order
+                    for i, (cid,) in zip(no_domain, returned):
+                        ids[i] = cid
+    return ids
 
 def main():
     if len(sys.argv) < 3:
@@ -1,10 +1,13 @@
-import re
-from typing import Dict, Any, Optional
+import asyncio
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple, Union
 
 try:
-    from pipeline.llm import call_llm_json
-except Exception:
+    from pipeline.llm import CONCURRENCY, acall_llm_json, call_llm_json, make_async_client
+    _llm_import_error = None
+except Exception as e:
     call_llm_json = None
+    acall_llm_json = None
+    _llm_import_error = e
 
 
 EXTRACTOR_VERSION = "v0.1.0"
@@ -25,21 +28,7 @@ ROUND_TYPES = [
 ]
 
 
-def _strip_code_fences(s: str) -> str:
-    s = s.strip()
-    s = re.sub(r"^```(json)?", "", s, flags=re.I).strip()
-    s = re.sub(r"```$", "", s).strip()
-    return s
-
-
-def extract_chunk(company_name: str, source_url: str, chunk_text: str) -> Dict[str, Any]:
-    """
-    Calls LLM to extract people, events, funding_rounds.
-    Must include evidence_quote that is an exact substring of chunk_text.
-    """
-    if not call_llm_json:
-        raise RuntimeError("LLM not configured. pipeline.llm.call_llm_json not importable.")
-
+def build_extraction_prompt(company_name: str, source_url: str, chunk_text: str) -> str:
     prompt = f"""
 You are an information extraction system. Extract ONLY what is explicitly supported by the text.
 Company: {company_name}
@@ -79,9 +68,10 @@ Hard rules:
 TEXT:
 \"\"\"{chunk_text}\"\"\"
 """.strip()
+    return prompt
 
-    payload = call_llm_json(prompt)
 
+def _normalize_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
     # normalize minimal fields
     if not isinstance(payload, dict):
         raise RuntimeError(f"Bad extraction payload type: {type(payload)}")
@@ -91,4 +81,61 @@ TEXT:
     payload.setdefault("events", [])
     payload.setdefault("funding_rounds", [])
 
-    return payload
\ No newline at end of file
+    return payload
+
+
+def extract_chunk(company_name: str, source_url: str, chunk_text: str) -> Dict[str, Any]:
+    """
+    Calls LLM to extract people, events, funding_rounds.
+    Must include evidence_quote that is an exact substring of chunk_text.
+    """
+    if not call_llm_json:
+        raise RuntimeError(
+            f"LLM not configured. pipeline.llm.call_llm_json not importable: {_llm_import_error!r}"
+        ) from _llm_import_error
+
+    prompt = build_extraction_prompt(company_name, source_url, chunk_text)
+    return _normalize_payload(call_llm_json(prompt))
+
+
+async def iter_extractions(
+    company_name: str, chunks: List[Tuple[str, str]]
+) -> AsyncIterator[Union[Dict[str, Any], Exception]]:
+    """
+    extract_chunk for many (source_url, chunk_text) pairs at once, up to
+    llm.CONCURRENCY requests in flight. Yields one payload or exception per
+    input, in input order, as soon as it is ready, so callers can persist early
+    results while later calls are still running; one failed chunk doesn't sink the rest.
+    """
+    if not acall_llm_json:
+        raise RuntimeError(
+            f"LLM not configured. pipeline.llm.acall_llm_json not importable: {_llm_import_error!r}"
+        ) from _llm_import_error
+
+    sem = asyncio.Semaphore(CONCURRENCY)
+
+    async def one(client, source_url: str, chunk_text: str) -> Dict[str, Any]:
+        prompt = build_extraction_prompt(company_name, source_url, chunk_text)
+        return _normalize_payload(await acall_llm_json(client, prompt, sem=sem))
+
+    async with make_async_client() as client:
+        tasks = [asyncio.create_task(one(client, u, t)) for u, t in chunks]
+        try:
+            for task in tasks:
+                try:
+                    yield await task
+                except Exception as e:
+                    yield e
+        finally:
+            # consumer stopped early: don't leave calls running against a closed client
+            for task in tasks:
+                task.cancel()
+
+
+async def extract_chunks_batch(
+    company_name: str, chunks: List[Tuple[str, str]]
+) -> List[Union[Dict[str, Any], Exception]]:
+    """
+    All of iter_extractions at once: one payload or exception per input, in input order.
+    """
+    return [r async for r in iter_extractions(company_name, chunks)]
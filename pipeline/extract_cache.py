@@ -0,0 +1,52 @@
+import hashlib
+from contextlib import nullcontext
+from typing import Any, Dict, Iterable
+
+import orjson
+
+from pipeline.extract import EXTRACTOR_VERSION
+
+
+def chunk_key(company_name: str, text: str) -> str:
+    """
+    Cache key for one extraction. The source URL is left out on purpose:
+    the same text on two pages of one company extracts the same way.
+    """
+    return hashlib.sha256(f"{company_name}\x00{text}".encode("utf-8")).hexdigest()
+
+
+def load_cached_extractions(conn, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    One round-trip for a whole batch: {chunk_sha256: payload} for keys cached by
+    the current EXTRACTOR_VERSION (a prompt/schema bump invalidates old rows).
+    """
+    keys = list(set(keys))
+    if not keys:
+        return {}
+    with conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT chunk_sha256, extraction_json::text
+                FROM extract_cache
+                WHERE chunk_sha256 = ANY(%s) AND extractor_version = %s
+                """,
+                (keys, EXTRACTOR_VERSION),
+            )
+            return {k: orjson.loads(v) for k, v in cur}
+
+
+def store_cached_extraction(conn, key: str, company_name: str, payload: Dict[str, Any], commit: bool = True) -> None:
+    with conn if commit else nullcontext():
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO extract_cache(chunk_sha256, company_name, extraction_json, extractor_version)
+                VALUES (%s, %s, %s::jsonb, %s)
+                ON CONFLICT(chunk_sha256) DO UPDATE
+                SET extraction_json = EXCLUDED.extraction_json,
+                    extractor_version = EXCLUDED.extractor_version,
+                    created_at = now()
+                """,
+                (key, company_name, orjson.dumps(payload).decode("utf-8"), EXTRACTOR_VERSION),
+            )
@@ -1,22 +1,40 @@
 import os
-import hashlib
-import time
-from typing import Optional, Tuple
+import re
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Tuple
 
 import httpx
-import psycopg2
 import trafilatura
 from dotenv import load_dotenv
 
+from pipeline.db import get_conn
+from pipeline.normalize import sha256_hex
+
 load_dotenv()
-DB = os.environ["DATABASE_URL"]
 
 UA = "ScoutBot/0.1 (+evidence-first; contact: internal)"
 DEFAULT_TIMEOUT = 25.0
+# bodies past this are skipped unread (streamed, so a huge download is cut off early)
+MAX_BODY_BYTES = int(os.environ.get("FETCH_MAX_BODY_BYTES", str(4 * 1024 * 1024)))
+
+HEADERS = {
+    "User-Agent": UA,
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Cache-Control": "no-cache",
+    "Pragma": "no-cache",
+}
+
 
+# fetch_and_store drops pages whose extracted text is shorter than this
+MIN_TEXT_CHARS = 500
 
-def sha256_hex(text: str) -> str:
-    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+# pages with an <article>/<main> landmark get trafilatura's full heuristics; the rest
+# (homepages, listings, login walls) run in fast mode, which skips the fallback extractors
+_ARTICLE_RE = re.compile(r"<(?:article|main)\b", re.I)
 
 
 def normalize_text(text: str) -> str:
@@ -30,6 +48,12 @@ def extract_main_text(html: str) -> Optional[str]:
     """
     Prefer trafilatura extraction. Fallback to crude text if it fails.
     """
+    # extracted text can't be longer than the markup it came from
+    if len(html) < MIN_TEXT_CHARS:
+        return None
+
+    fast = len(html) < 2000 or not _ARTICLE_RE.search(html)
+
     text = None
     try:
         text = trafilatura.extract(
@@ -37,6 +61,7 @@ def extract_main_text(html: str) -> Optional[str]:
             include_comments=False,
             include_tables=False,
             favor_precision=True,
+            fast=fast,
         )
     except Exception:
         text = None
@@ -49,13 +74,67 @@ def extract_main_text(html: str) -> Optional[str]:
     return text if text else None
 
 
-def get_existing_hash(cur, company_id: str, url: str) -> Optional[str]:
+_extract_pool: Optional[ProcessPoolExecutor] = None
+
+
+def extract_pool() -> ProcessPoolExecutor:
+    """
+    Process pool for extract_main_text, created on first use (workers start lazily too).
+    EXTRACT_WORKERS caps it (run_20 sets it to each batch worker's share); default cpu_count.
+
+    Workers come from a forkserver: by now this process runs an event loop, to_thread
+    workers and possibly other steps' threads, and forking it could hand the children
+    locks (logging, ssl, the DB pool's) held by a thread that doesn't exist there.
+    """
+    global _extract_pool
+    if _extract_pool is None:
+        workers = int(os.environ.get("EXTRACT_WORKERS", "0")) or os.cpu_count() or 1
+        _extract_pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("forkserver")
+        )
+    return _extract_pool
+
+
+def _discard_extract_pool(pool: ProcessPoolExecutor) -> None:
+    # a crashed worker breaks the whole executor; the next extract_pool() builds a fresh one
+    global _extract_pool
+    if _extract_pool is pool:
+        _extract_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def extract_in_pool(html: str) -> Optional[str]:
+    """
+    extract_main_text in the process pool. If a worker dies (trafilatura/lxml can crash
+    on bad markup) the pool is replaced and the page retried once; a page that breaks
+    the fresh pool too is treated as junk (None) rather than failing every later URL.
+    """
+    loop = asyncio.get_running_loop()
+    for _ in range(2):
+        pool = extract_pool()
+        try:
+            return await loop.run_in_executor(pool, extract_main_text, html)
+        except BrokenProcessPool:
+            _discard_extract_pool(pool)
+    return None
+
+
+def get_existing_hash(cur, company_id: str, url: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """
+    Returns (content_hash, etag, last_modified) for the stored source, all None if absent.
+    The validators are only returned when clean_text is stored: a 304 points back to that text.
+    """
     cur.execute(
-        "SELECT content_hash FROM sources WHERE company_id=%s::uuid AND url=%s",
+        """
+        SELECT content_hash,
+               CASE WHEN clean_text IS NOT NULL THEN etag END,
+               CASE WHEN clean_text IS NOT NULL THEN last_modified END
+        FROM sources WHERE company_id=%s::uuid AND url=%s
+        """,
         (company_id, url),
     )
     row = cur.fetchone()
-    return row[0] if row else None
+    return row if row else (None, None, None)
 
 
 def upsert_source(
@@ -65,89 +144,227 @@ def upsert_source(
     source_type: str,
     content_hash: str,
     clean_text: str,
-) -> None:
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+) -> Optional[str]:
     """
     Uses ON CONFLICT(company_id, url). Ensure UNIQUE(company_id, url) exists.
+    One round-trip: the conflict update only fires when the hash differs (or the row
+    has a hash but no text yet).
+    Returns "inserted", "updated", or None if the stored copy already matched.
     """
     cur.execute(
         """
-        INSERT INTO sources(company_id, url, source_type, fetched_at, content_hash, clean_text)
-        VALUES (%s::uuid, %s, %s, now(), %s, %s)
+        INSERT INTO sources(company_id, url, source_type, fetched_at, content_hash, clean_text, etag, last_modified)
+        VALUES (%s::uuid, %s, %s, now(), %s, %s, %s, %s)
         ON CONFLICT(company_id, url)
         DO UPDATE SET
           source_type = EXCLUDED.source_type,
           fetched_at = now(),
           content_hash = EXCLUDED.content_hash,
-          clean_text = EXCLUDED.clean_text
+          clean_text = EXCLUDED.clean_text,
+          etag = EXCLUDED.etag,
+          last_modified = EXCLUDED.last_modified
+        WHERE sources.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+           OR sources.clean_text IS NULL
+        RETURNING (xmax = 0) AS inserted
         """,
-        (company_id, url, source_type, content_hash, clean_text),
+        (company_id, url, source_type, content_hash, clean_text, etag, last_modified),
     )
+    row = cur.fetchone()
+    if row is None:
+        return None
+    return "inserted" if row[0] else "updated"
+
+
+def conditional_headers(etag: Optional[str], last_modified: Optional[str]) -> Dict[str, str]:
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    return headers
 
 
-def fetch_url(client: httpx.Client, url: str, retries: int = 2) -> Tuple[Optional[str], Optional[int]]:
+async def _read_capped(r: httpx.Response) -> Optional[bytes]:
     """
-    Returns (html, status_code). html is None on failure or blocked.
+    Streams the body, giving up (None) once it passes MAX_BODY_BYTES.
+    """
+    declared = r.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > MAX_BODY_BYTES:
+        return None
+    buf = bytearray()
+    async for piece in r.aiter_bytes():
+        buf += piece
+        if len(buf) > MAX_BODY_BYTES:
+            return None
+    return bytes(buf)
+
+
+async def fetch_url(
+    client: httpx.AsyncClient,
+    url: str,
+    retries: int = 2,
+    headers: Optional[Dict[str, str]] = None,
+) -> Tuple[Optional[str], Optional[int], Optional[httpx.Headers]]:
+    """
+    Returns (html, status_code, response_headers). html is None on failure, blocked,
+    304 Not Modified (when `headers` carried If-None-Match / If-Modified-Since),
+    or a 2xx body over MAX_BODY_BYTES.
     """
     last_status = None
     for attempt in range(retries + 1):
         try:
-            r = client.get(url)
-            last_status = r.status_code
-
-            # common blocked/paywalled/anti-bot statuses:
-            if r.status_code in (401, 402, 403):
-                return None, r.status_code
-
-            # not found / gone
-            if r.status_code in (404, 410):
-                return None, r.status_code
-
-            # rate limited
-            if r.status_code == 429:
-                # backoff and retry a bit
-                if attempt < retries:
-                    time.sleep(1.0 + attempt * 1.5)
-                    continue
-                return None, r.status_code
-
-            r.raise_for_status()
-            return r.text, r.status_code
+            async with client.stream("GET", url, headers=headers) as r:
+                last_status = r.status_code
+
+                # unchanged since the validators we sent; no body to process
+                if r.status_code == 304:
+                    return None, 304, r.headers
+
+                # common blocked/paywalled/anti-bot statuses:
+                if r.status_code in (401, 402, 403):
+                    return None, r.status_code, r.headers
+
+                # not found / gone
+                if r.status_code in (404, 410):
+                    return None, r.status_code, r.headers
+
+                # rate limited
+                if r.status_code == 429:
+                    # backoff and retry a bit
+                    if attempt < retries:
+                        await r.aclose()  # release the connection while backing off
+                        await asyncio.sleep(1.0 + attempt * 1.5)
+                        continue
+                    return None, r.status_code, r.headers
+
+                r.raise_for_status()
+                body = await _read_capped(r)
+                if body is None:
+                    return None, r.status_code, r.headers
+                return body.decode(r.encoding or "utf-8", errors="replace"), r.status_code, r.headers
 
         except httpx.TimeoutException:
             if attempt < retries:
-                time.sleep(0.8 + attempt * 1.2)
+                await asyncio.sleep(0.8 + attempt * 1.2)
                 continue
-            return None, last_status
+            return None, last_status, None
 
         except httpx.HTTPStatusError as e:
             status = e.response.status_code if e.response else last_status
             # treat as non-fatal (caller decides)
-            return None, status
+            return None, status, None
 
         except Exception:
             if attempt < retries:
-                time.sleep(0.5 + attempt)
+                await asyncio.sleep(0.5 + attempt)
                 continue
-            return None, last_status
+            return None, last_status, None
+
+    return None, last_status, None
+
+
+def load_validators(company_id: str, url: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """
+    Sync DB read (run via asyncio.to_thread): (content_hash, etag, last_modified) of the
+    stored copy, for callers that don't already have them (fetch_pending gets them from its claim).
+    """
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            return get_existing_hash(cur, company_id, url)
+
 
-    return None, last_status
+def backfill_hash(company_id: str, url: str) -> None:
+    """
+    Sync DB write: a 304 confirmed the stored clean_text, so a row still missing its hash
+    gets it computed in place (same digest as sha256_hex) instead of staying pending.
+    """
+    with get_conn() as conn:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    UPDATE sources
+                    SET content_hash = encode(sha256(convert_to(clean_text, 'UTF8')), 'hex'), fetched_at = now()
+                    WHERE company_id=%s::uuid AND url=%s AND content_hash IS NULL AND clean_text IS NOT NULL
+                    """,
+                    (company_id, url),
+                )
 
 
-def fetch_and_store(company_id: str, url: str, source_type: str = "website") -> None:
+def store_source(
+    company_id: str,
+    url: str,
+    source_type: str,
+    content_hash: str,
+    clean_text: str,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+) -> bool:
+    """
+    Sync DB write (run off the event loop via asyncio.to_thread).
+    Returns False if the stored hash already matches.
+    """
+    with get_conn() as conn:
+        with conn:
+            with conn.cursor() as cur:
+                if upsert_source(cur, company_id, url, source_type, content_hash, clean_text, etag, last_modified):
+                    return True
+
+                # same text; if the server sent validators, keep them current so the next fetch can 304
+                if etag or last_modified:
+                    cur.execute(
+                        """
+                        UPDATE sources SET etag=%s, last_modified=%s
+                        WHERE company_id=%s::uuid AND url=%s
+                          AND (etag IS DISTINCT FROM %s OR last_modified IS DISTINCT FROM %s)
+                        """,
+                        (etag, last_modified, company_id, url, etag, last_modified),
+                    )
+                return False
+
+
+def make_client() -> httpx.AsyncClient:
+    """
+    One client per run: keep-alive connections (and TLS sessions) are reused
+    across every URL on the same host; HTTP/2 (when the server offers it via ALPN)
+    multiplexes them over one connection.
+    """
+    return httpx.AsyncClient(
+        timeout=DEFAULT_TIMEOUT,
+        follow_redirects=True,
+        headers=HEADERS,
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=20),
+    )
+
+
+async def fetch_and_store(
+    client: httpx.AsyncClient,
+    company_id: str,
+    url: str,
+    source_type: str = "website",
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+    content_hash: Optional[str] = None,
+) -> None:
     """
     Fetch -> clean -> hash -> store (idempotent)
     Non-fatal on blocked URLs; prints SKIP and returns.
+    etag/last_modified/content_hash describe the stored row (see get_existing_hash);
+    the validators make the request conditional, so only pass them when clean_text is stored.
     """
-    headers = {
-        "User-Agent": UA,
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        "Accept-Language": "en-US,en;q=0.9",
-        "Cache-Control": "no-cache",
-        "Pragma": "no-cache",
-    }
+    html, status, headers = await fetch_url(
+        client, url, retries=2, headers=conditional_headers(etag, last_modified)
+    )
 
-    with httpx.Client(timeout=DEFAULT_TIMEOUT, follow_redirects=True, headers=headers) as client:
-        html, status = fetch_url(client, url, retries=2)
+    # 304: stored copy is current; skip body, trafilatura and hashing
+    if status == 304:
+        if content_hash is None:
+            await asyncio.to_thread(backfill_hash, company_id, url)
+        print(f"[NOCHANGE] not_modified: {url}")
+        return
 
     # blocked/paywalled/etc
     if html is None:
@@ -160,30 +377,37 @@ def fetch_and_store(company_id: str, url: str, source_type: str = "website") ->
         if status == 429:
             print(f"[SKIP] rate_limited status=429: {url}")
             return
+        # a 2xx only comes back without html when the body was over the cap
+        if status is not None and 200 <= status < 300:
+            print(f"[SKIP] too_big >{MAX_BODY_BYTES} bytes: {url}")
+            return
 
         print(f"[SKIP] fetch_failed status={status}: {url}")
         return
 
-    clean_text = extract_main_text(html)
-    if not clean_text or len(clean_text) < 500:
+    # trafilatura is CPU-bound and holds the GIL: run it in worker processes so pages
+    # extract in parallel; the DB write below is I/O and stays on a thread
+    clean_text = await extract_in_pool(html)
+    if not clean_text or len(clean_text) < MIN_TEXT_CHARS:
         print(f"[SKIP] too short/junk: {url}")
         return
 
     content_hash = sha256_hex(clean_text)
 
-    conn = psycopg2.connect(DB)
-    try:
-        with conn:
-            with conn.cursor() as cur:
-                old_hash = get_existing_hash(cur, company_id, url)
-                if old_hash == content_hash:
-                    print(f"[NOCHANGE] {url}")
-                    return
-
-                upsert_source(cur, company_id, url, source_type, content_hash, clean_text)
-                print(f"[STORED] {url} hash={content_hash[:10]}...")
-    finally:
-        conn.close()
+    stored = await asyncio.to_thread(
+        store_source,
+        company_id,
+        url,
+        source_type,
+        content_hash,
+        clean_text,
+        headers.get("etag"),
+        headers.get("last-modified"),
+    )
+    if not stored:
+        print(f"[NOCHANGE] {url}")
+        return
+    print(f"[STORED] {url} hash={content_hash[:10]}...")
 
 
 if __name__ == "__main__":
@@ -200,5 +424,12 @@ if __name__ == "__main__":
         "https://www.bloomberg.com/",  # will likely SKIP blocked
     ]
 
-    for u in urls:
-        fetch_and_store(COMPANY_ID, u, "website")
\ No newline at end of file
+    async def _one(client, url):
+        content_hash, etag, last_modified = await asyncio.to_thread(load_validators, COMPANY_ID, url)
+        await fetch_and_store(client, COMPANY_ID, url, "website", etag, last_modified, content_hash)
+
+    async def _run():
+        async with make_client() as client:
+            await asyncio.gather(*(_one(client, u) for u in urls))
+
+    asyncio.run(_run())
\ No newline at end of file
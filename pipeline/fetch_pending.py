@@ -1,13 +1,17 @@
 import os
 import sys
-import psycopg2
+import asyncio
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
 from dotenv import load_dotenv
 import httpx
 
 load_dotenv()
-DB = os.environ["DATABASE_URL"]
 
-from pipeline.fetch import fetch_and_store  # your existing function
+from pipeline.db import get_conn
+from pipeline.fetch import fetch_and_store, make_client  # your existing function
 
 
 def mark_fetch_error(conn, source_id: str, error_code: str, error_msg: str):
@@ -30,21 +34,78 @@ def mark_fetch_error(conn, source_id: str, error_code: str, error_msg: str):
         pass
 
 
+# Concurrency: overall cap, and one in-flight request per host so we don't trip rate limits
+GLOBAL_CONCURRENCY = int(os.environ.get("FETCH_CONCURRENCY", "16"))
+PER_HOST_CONCURRENCY = 1
+
+# a claimed row is left to its worker this long; failed/skipped rows become claimable again after it
+CLAIM_TTL = os.environ.get("FETCH_CLAIM_TTL", "15 minutes")
+
+# already-fetched rows not fetched or tried for this long are re-crawled with conditional
+# requests (an unchanged page costs a 304, not a download + extract); "" disables re-crawls
+RECRAWL_AFTER = os.environ.get("FETCH_RECRAWL_AFTER", "7 days") or None
+
+
+async def _fetch_all(company_id: str, rows) -> List[Tuple[str, str, Optional[BaseException]]]:
+    """
+    Fetches all claimed rows (pending and due re-crawls) concurrently.
+    Returns (source_id, url, exception or None) per row, in input order.
+    """
+    global_sem = asyncio.Semaphore(GLOBAL_CONCURRENCY)
+    host_sems: Dict[str, asyncio.Semaphore] = defaultdict(lambda: asyncio.Semaphore(PER_HOST_CONCURRENCY))
+
+    async def one(client: httpx.AsyncClient, source_id: str, url: str, source_type: str, *stored):
+        host = (urlparse(url).netloc or "").lower()
+        async with host_sems[host], global_sem:
+            print(f"[fetch_pending] fetching source_id={source_id} type={source_type} url={url}")
+            try:
+                await fetch_and_store(client, company_id, url, source_type, *stored)
+                return source_id, url, None
+            except Exception as e:
+                return source_id, url, e
+
+    async with make_client() as client:
+        return await asyncio.gather(*(one(client, *row) for row in rows))
+
+
 def fetch_pending(company_id: str, limit: int = 15):
-    conn = psycopg2.connect(DB)
-    try:
+    with get_conn() as conn:
         with conn:
             with conn.cursor() as cur:
+                # claim a batch in one short transaction: SKIP LOCKED keeps parallel workers
+                # disjoint, and the lease (not a held row lock) is what stops double-fetching,
+                # since store_source writes these rows from other connections mid-run.
+                # Pending rows go first; the rest of the batch is re-crawls that are due.
+                # The stored validators come back with the claim (only when there is
+                # clean_text for a 304 to point back to), so fetching needs no extra lookup
                 cur.execute(
                     """
-                    SELECT source_id::text, url, source_type
-                    FROM sources
-                    WHERE company_id=%s::uuid
-                      AND (clean_text IS NULL OR content_hash IS NULL)
+                    WITH claimed AS (
+                      UPDATE sources s
+                      SET fetch_claimed_at = now()
+                      FROM (
+                        SELECT source_id
+                        FROM sources
+                        WHERE company_id=%s::uuid
+                          AND (
+                            clean_text IS NULL OR content_hash IS NULL
+                            OR GREATEST(fetched_at, fetch_claimed_at) < now() - %s::interval
+                          )
+                          AND (fetch_claimed_at IS NULL OR fetch_claimed_at < now() - %s::interval)
+                        ORDER BY (clean_text IS NOT NULL AND content_hash IS NOT NULL), source_type, url
+                        LIMIT %s
+                        FOR UPDATE SKIP LOCKED
+                      ) c
+                      WHERE s.source_id = c.source_id
+                      RETURNING s.source_id, s.url, s.source_type, s.content_hash,
+                                CASE WHEN s.clean_text IS NOT NULL THEN s.etag END AS etag,
+                                CASE WHEN s.clean_text IS NOT NULL THEN s.last_modified END AS last_modified
+                    )
+                    SELECT source_id::text, url, source_type, etag, last_modified, content_hash
+                    FROM claimed
                     ORDER BY source_type, url
-                    LIMIT %s
                     """,
-                    (company_id, limit),
+                    (company_id, RECRAWL_AFTER, CLAIM_TTL, limit),
                 )
                 rows = cur.fetchall()
 
@@ -54,39 +115,34 @@ def fetch_pending(company_id: str, limit: int = 15):
         skipped = 0
         failed = 0
 
-        for source_id, url, source_type in rows:
-            print(f"[fetch_pending] fetching source_id={source_id} type={source_type} url={url}")
+        results = asyncio.run(_fetch_all(company_id, rows)) if rows else []
 
-            try:
-                fetch_and_store(company_id, url, source_type)
+        for source_id, url, err in results:
+            if err is None:
                 ok += 1
+                continue
 
-            except httpx.HTTPStatusError as e:
-                status = e.response.status_code if e.response else None
+            if isinstance(err, httpx.HTTPStatusError):
+                status = err.response.status_code if err.response else None
 
                 # common anti-bot/paywall/blocked cases
                 if status in (401, 402, 403, 404, 410, 429):
                     print(f"[SKIP_HTTP] status={status} url={url}")
                     skipped += 1
-                    mark_fetch_error(conn, source_id, f"http_{status}", str(e))
+                    mark_fetch_error(conn, source_id, f"http_{status}", str(err))
                     continue
 
                 print(f"[FAIL_HTTP] status={status} url={url}")
                 failed += 1
-                mark_fetch_error(conn, source_id, f"http_{status}", str(e))
+                mark_fetch_error(conn, source_id, f"http_{status}", str(err))
                 continue
 
-            except Exception as e:
-                print(f"[FAIL] url={url} err={type(e).__name__}: {e}")
-                failed += 1
-                mark_fetch_error(conn, source_id, "exception", str(e))
-                continue
+            print(f"[FAIL] url={url} err={type(err).__name__}: {err}")
+            failed += 1
+            mark_fetch_error(conn, source_id, "exception", str(err))
 
         print(f"[fetch_pending] done ok={ok} skipped={skipped} failed={failed}")
 
-    finally:
-        conn.close()
-
 
 def main():
     if len(sys.argv) < 2:
@@ -1,10 +1,12 @@
 import os
-import json
 import time
+import asyncio
+import hashlib
 from pathlib import Path
 from typing import Any, Dict, Optional
 
 import httpx
+import orjson
 from dotenv import load_dotenv
 
 # Always load .env from repo root (.../500co/.env), NOT from current working dir
@@ -19,6 +21,29 @@ TIMEOUT_S = float(os.getenv("OPENAI_TIMEOUT_S", "30"))
 MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "3"))
 SLEEP_BASE = float(os.getenv("OPENAI_RETRY_SLEEP_BASE", "1.5"))
 
+# max in-flight requests for acall_llm_json batches; keep under the account's RPM/TPM
+CONCURRENCY = int(os.getenv("OPENAI_CONCURRENCY", "16"))
+
+# opt-in response cache for dev reruns (e.g. LLM_CACHE_DIR=/tmp/llm_cache); off by default,
+# since batch extraction already has the Postgres extract_cache keyed on extractor_version
+CACHE_DIR = os.getenv("LLM_CACHE_DIR", "")
+CACHE_TTL_S = int(os.getenv("LLM_CACHE_TTL_S", "86400"))
+_cache = None
+_MISS = object()
+
+_client: Optional[httpx.Client] = None
+
+
+def _get_cache():
+    """
+    The diskcache.Cache at LLM_CACHE_DIR, opened on first use; None when caching is off.
+    """
+    global _cache
+    if _cache is None and CACHE_DIR:
+        import diskcache  # only needed when the cache is on
+        _cache = diskcache.Cache(CACHE_DIR)
+    return _cache
+
 
 def _get_api_key() -> str:
     """
@@ -32,21 +57,20 @@ def _get_api_key() -> str:
     return key
 
 
-def _strip_code_fences(text: str) -> str:
-    t = (text or "").strip()
-    if t.startswith("```"):
-        # remove first fence line
-        t = t.split("\n", 1)[-1]
-        # remove trailing fence
-        if t.rstrip().endswith("```"):
-            t = t.rsplit("```", 1)[0]
-    return t.strip()
+def _get_client() -> httpx.Client:
+    """
+    Process-wide client for call_llm_json, created on first use, so sequential calls
+    reuse one (HTTP/2) connection instead of a handshake per call/retry.
+    """
+    global _client
+    if _client is None:
+        _client = httpx.Client(timeout=TIMEOUT_S, http2=True)
+    return _client
 
 
-def call_llm_json(prompt: str, *, model: Optional[str] = None, max_tokens: int = 600, temperature: float = 0.1) -> Dict[str, Any]:
+def _build_request(prompt: str, model: Optional[str], max_tokens: int, temperature: float):
     """
-    Calls OpenAI Chat Completions endpoint and expects JSON in content.
-    Returns parsed dict. Retries on 429/5xx.
+    Returns (url, headers, payload) for one Chat Completions call.
     """
     key = _get_api_key()
     use_model = model or OPENAI_MODEL
@@ -61,40 +85,131 @@ def call_llm_json(prompt: str, *, model: Optional[str] = None, max_tokens: int =
         "model": use_model,
         "temperature": temperature,
         "max_tokens": max_tokens,
+        # JSON mode: content is a bare JSON object (no fences), so it parses as-is
+        "response_format": {"type": "json_object"},
         "messages": [
-            {"role": "system", "content": "Return STRICT JSON only. No markdown, no code fences."},
+            {"role": "system", "content": "Return a single JSON object."},
             {"role": "user", "content": prompt},
         ],
     }
+    return url, headers, payload
+
+
+def _cache_key(payload: Dict[str, Any]) -> str:
+    # model + prompt + sampling params: anything that changes the answer changes the key
+    return hashlib.sha256(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+def _parse_content(data: Dict[str, Any]) -> Dict[str, Any]:
+    # Extract content
+    content = data["choices"][0]["message"]["content"]
+
+    # Parse JSON
+    try:
+        return orjson.loads(content)
+    except orjson.JSONDecodeError:
+        raise RuntimeError(f"LLM did not return valid JSON. Raw content:\n{content}")
+
+
+def call_llm_json(prompt: str, *, model: Optional[str] = None, max_tokens: int = 600, temperature: float = 0.1) -> Dict[str, Any]:
+    """
+    Calls OpenAI Chat Completions endpoint and expects JSON in content.
+    Returns parsed dict. Retries on 429/5xx.
+    """
+    url, headers, payload = _build_request(prompt, model, max_tokens, temperature)
+    cache = _get_cache()
+    key = _cache_key(payload)
+    cached = cache.get(key, _MISS) if cache is not None else _MISS
+    if cached is not _MISS:
+        return cached
+    body = orjson.dumps(payload)  # once per call, not per retry; Content-Type is set in headers
 
     last_text = None
     for attempt in range(1, MAX_RETRIES + 1):
         try:
-            with httpx.Client(timeout=TIMEOUT_S) as client:
-                r = client.post(url, headers=headers, json=payload)
-                # retry on rate limit / transient
-                if r.status_code in (429, 500, 502, 503, 504):
-                    last_text = r.text
-                    time.sleep(SLEEP_BASE * attempt)
-                    continue
-                r.raise_for_status()
-                data = r.json()
-
-            # Extract content
-            content = data["choices"][0]["message"]["content"]
-            content = _strip_code_fences(content)
-            last_text = content
-
-            # Parse JSON
-            return json.loads(content)
-
-        except json.JSONDecodeError:
-            raise RuntimeError(f"LLM did not return valid JSON. Raw content:\n{last_text}")
+            r = _get_client().post(url, headers=headers, content=body)
+            # retry on rate limit / transient
+            if r.status_code in (429, 500, 502, 503, 504):
+                last_text = r.text
+                time.sleep(SLEEP_BASE * attempt)
+                continue
+            r.raise_for_status()
+            data = orjson.loads(r.content)
+
+            parsed = _parse_content(data)
+            if cache is not None:
+                cache.set(key, parsed, expire=CACHE_TTL_S)
+            return parsed
+
         except httpx.HTTPStatusError as e:
             # non-retryable 4xx etc
             raise RuntimeError(f"OpenAI HTTP error: {e.response.status_code} {e.response.text}") from e
+        except RuntimeError:
+            raise
         except Exception as e:
             last_text = str(e)
             time.sleep(SLEEP_BASE * attempt)
 
-    raise RuntimeError(f"OpenAI call failed after retries. Last response: {last_text}")
\ No newline at end of file
+    raise RuntimeError(f"OpenAI call failed after retries. Last response: {last_text}")
+
+
+async def acall_llm_json(
+    client: httpx.AsyncClient,
+    prompt: str,
+    *,
+    sem: Optional[asyncio.Semaphore] = None,
+    model: Optional[str] = None,
+    max_tokens: int = 600,
+    temperature: float = 0.1,
+) -> Dict[str, Any]:
+    """
+    Async call_llm_json on a shared client, so many prompts can be in flight at once.
+    `sem` caps concurrency across a batch; it is held only while a request is in flight,
+    not during retry backoff.
+    """
+    url, headers, payload = _build_request(prompt, model, max_tokens, temperature)
+    cache = _get_cache()
+    key = _cache_key(payload)
+    cached = cache.get(key, _MISS) if cache is not None else _MISS
+    if cached is not _MISS:
+        return cached
+    body = orjson.dumps(payload)  # once per call, not per retry; Content-Type is set in headers
+    sem = sem or asyncio.Semaphore(1)
+
+    last_text = None
+    for attempt in range(1, MAX_RETRIES + 1):
+        try:
+            async with sem:
+                r = await client.post(url, headers=headers, content=body)
+            # retry on rate limit / transient
+            if r.status_code in (429, 500, 502, 503, 504):
+                last_text = r.text
+                await asyncio.sleep(SLEEP_BASE * attempt)
+                continue
+            r.raise_for_status()
+            parsed = _parse_content(orjson.loads(r.content))
+            if cache is not None:
+                cache.set(key, parsed, expire=CACHE_TTL_S)
+            return parsed
+
+        except httpx.HTTPStatusError as e:
+            # non-retryable 4xx etc
+            raise RuntimeError(f"OpenAI HTTP error: {e.response.status_code} {e.response.text}") from e
+        except RuntimeError:
+            raise
+        except Exception as e:
+            last_text = str(e)
+            await asyncio.sleep(SLEEP_BASE * attempt)
+
+    raise RuntimeError(f"OpenAI call failed after retries. Last response: {last_text}")
+
+
+def make_async_client() -> httpx.AsyncClient:
+    """
+    One client per batch; pool size matches CONCURRENCY so connections are reused.
+    """
+    return httpx.AsyncClient(
+        timeout=TIMEOUT_S,
+        http2=True,
+        limits=httpx.Limits(max_connections=CONCURRENCY, max_keepalive_connections=CONCURRENCY),
+    )
@@ -1,21 +1,82 @@
 import re
 import hashlib
 import unicodedata
+from typing import Tuple
+from urllib.parse import urlparse
+
+_PUNCT_RE = re.compile(r"[\.\,\(\)\[\]\{\}\-_/]+")
+_WS_RE = re.compile(r"\s+")
+
+# encode+hash long texts in slices so a multi-MB page never needs a full second (bytes) copy;
+# utf-8 of the concatenation == concatenation of the slices' utf-8
+_HASH_SLICE_CHARS = 1 << 20
 
 def sha256_hex(text: str) -> str:
-    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+    if len(text) <= _HASH_SLICE_CHARS:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+    h = hashlib.sha256()
+    for i in range(0, len(text), _HASH_SLICE_CHARS):
+        h.update(text[i:i + _HASH_SLICE_CHARS].encode("utf-8"))
+    return h.hexdigest()
+
+class _CombiningTable(dict):
+    """
+    str.translate table that drops combining marks. Filled lazily per code point
+    (identity entries included), so repeat characters are plain C dict hits.
+    """
+
+    def __missing__(self, cp: int):
+        v = None if unicodedata.combining(chr(cp)) else cp
+        self[cp] = v
+        return v
+
+_STRIP_COMBINING = _CombiningTable()
 
 def normalize_person_name(name: str) -> str:
     if not name:
         return ""
-    # remove accents
-    s = unicodedata.normalize("NFKD", name)
-    s = "".join(c for c in s if not unicodedata.combining(c))
+    # remove accents (ASCII is already NFKD with no combining marks)
+    s = name if name.isascii() else unicodedata.normalize("NFKD", name).translate(_STRIP_COMBINING)
     s = s.lower().strip()
     # remove titles / punctuation-ish
-    s = re.sub(r"[\.\,\(\)\[\]\{\}\-_/]+", " ", s)
-    s = re.sub(r"\s+", " ", s).strip()
+    s = _PUNCT_RE.sub(" ", s)
+    s = _WS_RE.sub(" ", s).strip()
     return s
 
 def title_hash(title: str) -> str:
-    return sha256_hex((title or "").strip().lower())
\ No newline at end of file
+    return sha256_hex((title or "").strip().lower())
+
+URL_JUNK = str.maketrans("", "", "\t\r\n")  # urlsplit drops these anywhere in a url
+
+def split_http_url(u: str) -> Tuple[str, str, str, str]:
+    """
+    (scheme, netloc, path, query) of a url that starts with http(s)://, by index scanning.
+    Same pieces urlparse gives for that shape (fragment and ;params dropped),
+    without its generic-grammar overhead.
+    """
+    i = u.index("://")
+    scheme = u[:i]
+    rest = u[i + 3:]
+
+    end = len(rest)
+    for ch in "/?#":
+        j = rest.find(ch)
+        if j != -1 and j < end:
+            end = j
+    netloc, rest = rest[:end], rest[end:]
+    if "[" in netloc or "]" in netloc or not netloc.isascii():
+        # IPv6 literal (or a malformed one), or non-ASCII that urlparse NFKC-checks:
+        # let urlparse validate it, raising as before
+        p = urlparse(u)
+        return p.scheme, p.netloc, p.path, p.query
+
+    j = rest.find("#")
+    if j != -1:
+        rest = rest[:j]
+    path, _, query = rest.partition("?")
+
+    # urlparse splits ;params off the last path segment
+    j = path.find(";", path.rfind("/"))
+    if j != -1:
+        path = path[:j]
+    return scheme, netloc, path, query
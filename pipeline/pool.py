@@ -0,0 +1,15 @@
+from psycopg2.pool import ThreadedConnectionPool
+
+
+class RetainingPool(ThreadedConnectionPool):
+    """
+    ThreadedConnectionPool closes a returned connection once `minconn` are idle, so
+    with minconn=1 every connection past the first in flight is thrown away on putconn.
+    This one still opens only minconn up front but keeps up to maxconn idle for reuse.
+    Shared by the pipeline's pool (pipeline/db.py) and the console's (app/_db.py).
+    """
+
+    def __init__(self, minconn, maxconn, *args, **kwargs):
+        super().__init__(minconn, maxconn, *args, **kwargs)
+        # _putconn's retention check reads self.minconn; the initial connects are done
+        self.minconn = self.maxconn
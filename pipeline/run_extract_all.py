@@ -1,10 +1,15 @@
 import os
 import sys
-import psycopg2
+import asyncio
+from contextlib import aclosing
+from typing import Dict, Iterator, Tuple
+
 from dotenv import load_dotenv
 
+from pipeline.db import get_conn
 from pipeline.chunk import chunk_text
-from pipeline.extract import extract_chunk
+from pipeline.extract import iter_extractions
+from pipeline.extract_cache import chunk_key, load_cached_extractions, store_cached_extraction
 from pipeline.validate import validate_extraction_for_chunk
 from pipeline.upsert import persist_accepted_extraction
 
@@ -14,7 +19,6 @@ except Exception:
     triage_chunk = None
 
 load_dotenv()
-DB = os.environ["DATABASE_URL"]
 
 
 def load_company(conn, company_id: str):
@@ -27,12 +31,16 @@ def load_company(conn, company_id: str):
         return row[0] if row else "UNKNOWN"
 
 
-def load_sources(conn, company_id: str, include_types):
+def iter_sources(conn, company_id: str, include_types, itersize: int = 16) -> Iterator[tuple]:
     """
     FIX: source_type is ENUM in DB (source_type_enum).
     We cast source_type to text so we can compare with a text array.
+    Streams rows through a server-side cursor, `itersize` at a time, so only a
+    few sources' clean_text are held client-side while they are chunked.
+    The clean_text predicates and ORDER BY match sources_extract_ready_idx (sql/007).
     """
-    with conn.cursor() as cur:
+    with conn.cursor(name="extract_sources") as cur:
+        cur.itersize = itersize
         cur.execute(
             """
             SELECT source_id::text, url, source_type::text, clean_text
@@ -45,44 +53,155 @@ def load_sources(conn, company_id: str, include_types):
             """,
             (company_id, include_types),
         )
-        return cur.fetchall()
+        yield from cur
+
+
+def in_savepoint(conn, fn, /, *args, **kwargs):
+    """
+    fn(*args, **kwargs) inside SAVEPOINT chunk: a failed write is rolled back on its
+    own instead of aborting the rest of the source's open transaction.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SAVEPOINT chunk")
+    try:
+        result = fn(*args, **kwargs)
+    except Exception:
+        with conn.cursor() as cur:
+            cur.execute("ROLLBACK TO SAVEPOINT chunk")
+        raise
+    with conn.cursor() as cur:
+        cur.execute("RELEASE SAVEPOINT chunk")
+    return result
+
+
+async def extract_and_persist(conn, company_id: str, company_name: str, jobs) -> Tuple[Dict[str, int], int]:
+    """
+    jobs: list of (source_id, url, heading, text).
+    Validates + persists each extraction in job order while later LLM calls are still
+    in flight; DB writes run on a thread (one at a time, on the one connection) so the
+    event loop keeps driving the HTTP calls. Chunks already in extract_cache (or
+    repeated within the batch) skip the LLM.
+    Each source's writes (jobs are grouped by source) share one transaction, with a
+    savepoint per write, and commit when the next source starts.
+    Returns (persisted totals, rejected step count).
+    """
+    total_persisted = {"people": 0, "events": 0, "funding": 0, "evidence": 0}
+    total_rejected_steps = 0
+
+    # identical chunk text (re-runs, boilerplate repeated across pages) is extracted
+    # once: earlier runs come from extract_cache, repeats within this batch reuse
+    # the first job's result
+    keys = [chunk_key(company_name, text) for _, _, _, text in jobs]
+    try:
+        results = await asyncio.to_thread(load_cached_extractions, conn, keys)
+    except Exception as e:
+        print(f"  [CACHE_SKIP] {type(e).__name__}: {e}")
+        results = {}
+    print(f"  [CACHE] hits={sum(k in results for k in keys)}/{len(keys)}")
+
+    misses = {}  # key -> (url, text), first occurrence
+    for key, (_, url, _, text) in zip(keys, jobs):
+        if key not in results:
+            misses.setdefault(key, (url, text))
+    async with aclosing(iter_extractions(company_name, list(misses.values()))) as extractions:
+        current_source = None
+        for key, (source_id, url, heading, text) in zip(keys, jobs):
+            if source_id != current_source:
+                if current_source is not None:
+                    await asyncio.to_thread(conn.commit)
+                current_source = source_id
+            print(f"  [CHUNK] heading='{heading}' url={url}")
+
+            if key in results:
+                extraction = results[key]
+            else:
+                extraction = results[key] = await anext(extractions)
+                if not isinstance(extraction, Exception):
+                    try:
+                        await asyncio.to_thread(
+                            in_savepoint, conn, store_cached_extraction, conn, key, company_name, extraction, commit=False
+                        )
+                    except Exception as e:
+                        print(f"  [CACHE_FAIL] {type(e).__name__}: {e}")
+
+            if isinstance(extraction, Exception):
+                print(f"  [EXTRACT_FAIL] {type(extraction).__name__}: {extraction}")
+                total_rejected_steps += 1
+                continue
+
+            # validate
+            accepted, stats = validate_extraction_for_chunk(extraction, text)
+            print(
+                f"  [VALIDATE] people_ok={stats['people_ok']} events_ok={stats['events_ok']} "
+                f"funding_ok={stats['funding_ok']} rejected={stats['rejected']}"
+            )
+
+            if stats["people_ok"] == 0 and stats["events_ok"] == 0 and stats["funding_ok"] == 0:
+                continue
+
+            # persist
+            try:
+                persisted = await asyncio.to_thread(
+                    in_savepoint,
+                    conn,
+                    persist_accepted_extraction,
+                    conn=conn,
+                    company_id=company_id,
+                    source_id=source_id,
+                    url=url,
+                    accepted=accepted,
+                    commit=False,
+                )
+                print(f"  [UPSERT] {persisted}")
+
+                total_persisted["people"] += int(persisted.get("people_upserted", 0))
+                total_persisted["events"] += int(persisted.get("events_upserted", 0))
+                total_persisted["funding"] += int(persisted.get("funding_upserted", 0))
+                total_persisted["evidence"] += int(persisted.get("evidence_inserted", 0))
+
+            except Exception as e:
+                print(f"  [UPSERT_FAIL] {type(e).__name__}: {e}")
+                total_rejected_steps += 1
+                continue
+
+        await asyncio.to_thread(conn.commit)
+
+    return total_persisted, total_rejected_steps
 
 
 def main(company_id: str):
     include_types = ["about", "ai_discovered", "news", "web_search", "website"]
     max_chunks_per_source = int(os.environ.get("MAX_CHUNKS_PER_SOURCE", "3"))
 
-    conn = psycopg2.connect(DB)
-    try:
+    with get_conn() as conn:
         company_name = load_company(conn, company_id)
-        sources = load_sources(conn, company_id, include_types)
 
         print(
             f"[run_extract_all] company_id={company_id} company={company_name} "
-            f"sources_loaded={len(sources)} include_types={include_types} "
-            f"max_chunks_per_source={max_chunks_per_source}"
+            f"include_types={include_types} max_chunks_per_source={max_chunks_per_source}"
         )
 
         total_persisted = {"people": 0, "events": 0, "funding": 0, "evidence": 0}
         total_rejected_steps = 0
 
-        for (source_id, url, source_type, clean_text) in sources:
+        # pass 1: chunk + triage (cheap, local); collect chunks worth an LLM call
+        jobs = []  # (source_id, url, heading, text)
+        sources_loaded = 0
+        for (source_id, url, source_type, clean_text) in iter_sources(conn, company_id, include_types):
+            sources_loaded += 1
             print("\n" + "=" * 90)
             print(f"[SOURCE] type={source_type} url={url} source_id={source_id} chars={len(clean_text)}")
 
             chunks = chunk_text(clean_text, max_chars=2400, max_chunks_per_source=max_chunks_per_source)
             print(f"[CHUNKS] {len(chunks)}")
 
-            if not chunks:
-                continue
-
             for ch in chunks:
-                heading = ch["heading"]
-                text = ch["text"]
+                heading = ch.heading
+                text = ch.raw
 
                 # triage (best effort)
                 if triage_chunk:
-                    t = triage_chunk(text)
+                    t = triage_chunk(ch)
                     label = (t.get("labels") or "irrelevant")
                     conf = float(t.get("confidence") or 0.0)
                     reason = t.get("reason") or ""
@@ -92,51 +211,20 @@ def main(company_id: str):
                 else:
                     print(f"  - triage heading='{heading}' label=SKIPPED(no_triage)")
 
-                # extract
-                try:
-                    extraction = extract_chunk(company_name, url, text)
-                except Exception as e:
-                    print(f"  [EXTRACT_FAIL] {type(e).__name__}: {e}")
-                    total_rejected_steps += 1
-                    continue
-
-                # validate
-                accepted, stats = validate_extraction_for_chunk(extraction, text)
-                print(
-                    f"  [VALIDATE] people_ok={stats['people_ok']} events_ok={stats['events_ok']} "
-                    f"funding_ok={stats['funding_ok']} rejected={stats['rejected']}"
-                )
+                jobs.append((source_id, url, heading, text))
 
-                if stats["people_ok"] == 0 and stats["events_ok"] == 0 and stats["funding_ok"] == 0:
-                    continue
-
-                # persist
-                try:
-                    persisted = persist_accepted_extraction(
-                        conn=conn,
-                        company_id=company_id,
-                        source_id=source_id,
-                        url=url,
-                        accepted=accepted,
-                    )
-                    print(f"  [UPSERT] {persisted}")
-
-                    total_persisted["people"] += int(persisted.get("people_upserted", 0))
-                    total_persisted["events"] += int(persisted.get("events_upserted", 0))
-                    total_persisted["funding"] += int(persisted.get("funding_upserted", 0))
-                    total_persisted["evidence"] += int(persisted.get("evidence_inserted", 0))
-
-                except Exception as e:
-                    print(f"  [UPSERT_FAIL] {type(e).__name__}: {e}")
-                    total_rejected_steps += 1
-                    continue
+        # pass 2: extract every surviving chunk concurrently (network-bound), persisting
+        # results in order as they land
+        print("\n" + "=" * 90)
+        print(f"[EXTRACT] sources_loaded={sources_loaded} chunks={len(jobs)}")
+        if jobs:
+            total_persisted, total_rejected_steps = asyncio.run(
+                extract_and_persist(conn, company_id, company_name, jobs)
+            )
 
         print("\n" + "=" * 90)
         print(f"[run_extract_all] DONE persisted={total_persisted} rejected_steps={total_rejected_steps}")
 
-    finally:
-        conn.close()
-
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
@@ -1,23 +1,19 @@
 import os
 import json
-import psycopg2
 from dotenv import load_dotenv
 
+from pipeline.db import get_conn
 from pipeline.chunk import chunk_text
 from pipeline.validate import validate_extraction
 
 load_dotenv()
-DB = os.environ["DATABASE_URL"]
 
 def load_one_source_text(source_id: str):
-    conn = psycopg2.connect(DB)
-    try:
+    with get_conn() as conn:
         with conn.cursor() as cur:
             cur.execute("SELECT url, clean_text FROM sources WHERE source_id=%s::uuid", (source_id,))
             row = cur.fetchone()
             return row
-    finally:
-        conn.close()
 
 def main():
     source_id = os.environ.get("SOURCE_ID", "").strip()
@@ -2,18 +2,18 @@ print("RUN_TRIAGE_START")
 
 import os
 import sys
-import psycopg2
+from concurrent.futures import ProcessPoolExecutor
+
 from dotenv import load_dotenv
 
+from pipeline.db import get_conn
 from pipeline.chunk import chunk_text
 from pipeline.triage import triage_chunk
 
 load_dotenv()
-DB = os.environ["DATABASE_URL"]
 
 def load_sources(company_id: str):
-    conn = psycopg2.connect(DB)
-    try:
+    with get_conn() as conn:
         with conn.cursor() as cur:
             cur.execute(
                 """
@@ -26,8 +26,6 @@ def load_sources(company_id: str):
                 (company_id,),
             )
             return cur.fetchall()
-    finally:
-        conn.close()
 
 def main():
     # Priority: CLI arg > env var
@@ -46,16 +44,26 @@ def main():
     rows = load_sources(company_id)
     print(f"[run_triage] sources={len(rows)} company_id={company_id}")
 
+    # chunk everything first, then triage all chunks at once across cores (pure CPU)
+    per_source = []
     for source_id, url, source_type, clean_text in rows:
+        chunks = chunk_text(clean_text, max_chars=1600)
+        per_source.append((source_id, url, source_type, chunks))
+
+    # Heading boost: include heading into triage text
+    texts = [f"{ch.heading}\n{ch.raw}" for *_, chunks in per_source for ch in chunks]
+    workers = int(os.environ.get("TRIAGE_WORKERS", "0")) or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        results = iter(list(ex.map(triage_chunk, texts, chunksize=32)))
+
+    for source_id, url, source_type, chunks in per_source:
         print("\n" + "=" * 90)
         print(f"[SOURCE] {url} type={source_type} source_id={source_id}")
-
-        chunks = chunk_text(clean_text, max_chars=1600, min_chars=300)
         print(f"[CHUNKS] {len(chunks)}")
 
-        for i, (heading, ctext) in enumerate(chunks, start=1):
-            # Heading boost: include heading into triage text
-            tri = triage_chunk(f"{heading}\n{ctext}")
+        for i, ch in enumerate(chunks, start=1):
+            heading, ctext = ch.heading, ch.raw
+            tri = next(results)
             labels = ",".join(tri["labels"])
             conf = tri["confidence"]
             reason = tri["reason"]
@@ -1,11 +1,10 @@
 import os
-import psycopg2
 from dotenv import load_dotenv
 
+from pipeline.db import get_conn
 from pipeline.upsert import persist_accepted_extraction
 
 load_dotenv()
-DB = os.environ["DATABASE_URL"]
 
 def main():
     company_id = os.environ.get("COMPANY_ID", "").strip()
@@ -18,8 +17,7 @@ def main():
         return
 
     # Fetch URL for source_id
-    conn = psycopg2.connect(DB)
-    try:
+    with get_conn() as conn:
         with conn.cursor() as cur:
             cur.execute("SELECT url FROM sources WHERE source_id=%s::uuid", (source_id,))
             row = cur.fetchone()
@@ -57,8 +55,6 @@ def main():
         stats = persist_accepted_extraction(conn, company_id, source_id, url, accepted)
         print("STATS:", stats)
 
-    finally:
-        conn.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,5 +1,9 @@
 import re
-from typing import Dict, List
+from typing import Dict, Union
+
+import ahocorasick
+
+from pipeline.chunk import Chunk
 
 LABELS = ["founders_team", "funding", "commercial_event", "irrelevant"]
 
@@ -43,28 +47,119 @@ NOISE_KW = [
 # Role regex (cheap signal boost)
 ROLE_RE = re.compile(r"\b(CEO|CTO|CFO|COO|Chief|Founder|Co-?Founder|VP|Vice President|Head of|Managing Director)\b", re.I)
 
-def _score_keywords(text_l: str, kws: List[str]) -> int:
-    return sum(1 for kw in kws if kw in text_l)
+WS_RE = re.compile(r"\s+")
+
+_PACKS = {
+    "founders": FOUNDERS_KW,
+    "funding": FUNDING_KW,
+    "commercial": COMMERCIAL_KW,
+    "product": PRODUCT_KW,
+    "noise": NOISE_KW,
+}
+
+
+def _build_automaton() -> ahocorasick.Automaton:
+    # every keyword of every pack in one Aho-Corasick automaton: one scan of the text
+    # finds them all (overlaps included, e.g. "co-founder" and "founder")
+    a = ahocorasick.Automaton()
+    for pack, kws in _PACKS.items():
+        for kw in kws:
+            a.add_word(kw, (kw, pack))
+    a.make_automaton()
+    return a
+
+
+_KEYWORDS_AC = _build_automaton()
+
+# ROLE_RE's alternatives as plain lowercase terms; same automaton trick, with the \b checks
+# and leftmost non-overlapping selection done by hand
+_ROLE_TERMS = [
+    "ceo", "cto", "cfo", "coo", "chief", "founder", "cofounder", "co-founder",
+    "vp", "vice president", "head of", "managing director",
+]
+_ROLES_AC = ahocorasick.Automaton()
+for _term in _ROLE_TERMS:
+    _ROLES_AC.add_word(_term, len(_term))
+_ROLES_AC.make_automaton()
+
+# every role term contains one of these; most chunks contain none, and a few
+# C-level `in` checks rule that out faster than walking the automaton
+_ROLE_ANCHORS = (
+    "founder", "ceo", "cto", "cfo", "coo", "chief",
+    "vp", "vice president", "head of", "managing director",
+)
+
+
+def _is_word_char(ch: str) -> bool:
+    # what \b treats as a word character
+    return ch.isalnum() or ch == "_"
+
+
+def _count_roles(t: str, tl: str) -> int:
+    """
+    len(ROLE_RE.findall(t)), from one automaton pass over the lowercased text.
+    """
+    if len(tl) != len(t) or "ı" in tl or "ſ" in tl:
+        # lower() changed lengths (e.g. "İ") so offsets don't line up, or the text has
+        # letters re.I also equates with i / s; let the regex decide
+        return len(ROLE_RE.findall(t))
+    if not any(a in tl for a in _ROLE_ANCHORS):
+        return 0
+
+    n = len(tl)
+    hits = []
+    for end, length in _ROLES_AC.iter(tl):
+        start = end - length + 1
+        if start > 0 and _is_word_char(tl[start - 1]):
+            continue
+        if end + 1 < n and _is_word_char(tl[end + 1]):
+            continue
+        hits.append((start, end))
+
+    # findall doesn't overlap: "co-founder" is one hit, not also "founder"
+    hits.sort()
+    count = 0
+    last_end = -1
+    for start, end in hits:
+        if start > last_end:
+            count += 1
+            last_end = end
+    return count
+
+
+def _score_keywords(text_l: str) -> Dict[str, int]:
+    """
+    {pack: number of that pack's keywords present in text_l}; a keyword counts once
+    no matter how often it occurs.
+    """
+    scores = dict.fromkeys(_PACKS, 0)
+    for kw, pack in {hit for _, hit in _KEYWORDS_AC.iter(text_l)}:
+        scores[pack] += 1
+    return scores
 
-def triage_chunk(chunk_text: str) -> Dict:
+def triage_chunk(chunk: Union[str, Chunk]) -> Dict:
     """
     Cheap triage: returns {labels:[...], confidence:0..1, reason:"..."}
-    Multi-label allowed.
+    Multi-label allowed. A Chunk's precomputed normalized/lower text is reused.
     """
-    t = re.sub(r"\s+", " ", chunk_text).strip()
-    tl = t.lower()
+    if isinstance(chunk, Chunk):
+        t, tl = chunk.normalized, chunk.lower
+    else:
+        t = WS_RE.sub(" ", chunk).strip()
+        tl = t.lower()
 
     # quick exits
     if len(t) < 250:
         return {"labels": ["irrelevant"], "confidence": 0.9, "reason": "too_short"}
 
-    founders = _score_keywords(tl, FOUNDERS_KW)
-    funding = _score_keywords(tl, FUNDING_KW)
-    commercial_base = _score_keywords(tl, COMMERCIAL_KW)
-    product = _score_keywords(tl, PRODUCT_KW)
-    noise = _score_keywords(tl, NOISE_KW)
+    scores = _score_keywords(tl)
+    founders = scores["founders"]
+    funding = scores["funding"]
+    commercial_base = scores["commercial"]
+    product = scores["product"]
+    noise = scores["noise"]
 
-    role_hits = len(ROLE_RE.findall(t))
+    role_hits = _count_roles(t, tl)
 
     labels = []
     reason_parts = []
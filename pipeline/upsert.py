@@ -1,149 +1,266 @@
+import datetime
+import io
 import hashlib
-from typing import Dict, Any, Optional
+from contextlib import nullcontext
+from typing import Dict, Any, List, Optional, Tuple
+
+from dateutil import parser as date_parser
+from psycopg2.extras import execute_values
 
 def _norm_name(name: str) -> str:
     return " ".join((name or "").strip().lower().split())
 
 def _title_hash(title: str) -> str:
+    # part of the events/funding ON CONFLICT keys: changing the digest (or its
+    # normalization) would stop new rows from matching ones already stored
     return hashlib.sha256((title or "").strip().lower().encode("utf-8")).hexdigest()[:16]
 
 
-def persist_accepted_extraction(conn, company_id: str, source_id: str, url: str, accepted: Dict[str, Any]) -> Dict[str, int]:
+# two far-apart defaults: a spelling that parses differently under each is missing a part
+_DATE_DEFAULTS = (datetime.datetime(2000, 1, 1), datetime.datetime(2001, 12, 28))
+
+
+def _parse_date(value) -> Optional[datetime.date]:
+    """
+    A payload date as a datetime.date, or None if it is missing, partial ("early 2024",
+    "March 2024") or not a real date. The parsed value is both what gets stored and the
+    conflict key, so two spellings of one day ("2024-1-1", "2024-01-01T00:00:00Z",
+    "Jan 1, 2024") always land in one VALUES row.
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    s = str(value).strip()
+    if not s:
+        return None
+    try:
+        return datetime.date.fromisoformat(s)
+    except ValueError:
+        pass
+    try:
+        a, b = (date_parser.parse(s, default=d) for d in _DATE_DEFAULTS)
+    except (ValueError, OverflowError):
+        return None
+    return a.date() if a.date() == b.date() else None
+
+
+def _dedupe(rows: List[tuple], key_of, merge) -> Tuple[List[tuple], List[int]]:
+    """
+    One multi-row ON CONFLICT DO UPDATE can't touch the same row twice, so rows that share
+    a conflict key are merged first (merge(kept, later) mirrors what sequential upserts
+    would leave). key_of returning None means "never conflicts" and the row is kept as is.
+    Returns (unique_rows, index into unique_rows for every input row).
+    """
+    unique: List[tuple] = []
+    slot: Dict[Any, int] = {}
+    index: List[int] = []
+    for row in rows:
+        k = key_of(row)
+        if k is not None and k in slot:
+            i = slot[k]
+            unique[i] = merge(unique[i], row)
+        else:
+            i = len(unique)
+            unique.append(row)
+            if k is not None:
+                slot[k] = i
+        index.append(i)
+    return unique, index
+
+
+# evidence batches at least this big go through COPY instead of one multi-row INSERT
+EVIDENCE_COPY_THRESHOLD = 256
+
+
+def _csv_field(v) -> str:
+    # COPY csv: unquoted empty is NULL, a quoted "" stays an empty string
+    if v is None:
+        return ""
+    return '"' + str(v).replace('"', '""') + '"'
+
+
+def _copy_evidence(cur, rows: List[tuple]) -> None:
+    buf = io.StringIO()
+    for row in rows:
+        buf.write(",".join(map(_csv_field, row)))
+        buf.write("\n")
+    buf.seek(0)
+    cur.copy_expert(
+        """
+        COPY evidence(object_type, object_id, field, value, source_id, url, quote, confidence, extractor_version)
+        FROM STDIN WITH (FORMAT csv)
+        """,
+        buf,
+    )
+
+
+def _upsert_returning_ids(cur, query: str, rows: List[tuple], template: str) -> List[str]:
+    # RETURNING rows come back in VALUES order, so ids line up with `rows`
+    if not rows:
+        return []
+    return [r[0] for r in execute_values(cur, query, rows, template=template, page_size=len(rows), fetch=True)]
+
+
+def persist_accepted_extraction(
+    conn, company_id: str, source_id: str, url: str, accepted: Dict[str, Any], commit: bool = True
+) -> Dict[str, int]:
     """
     Persists accepted extraction deterministically.
+    One round-trip per entity type (people, events, funding) plus one for all evidence.
+    commit=False leaves the writes in the caller's open transaction.
     Returns stats dict for logging.
     """
-    people_upserted = 0
-    events_upserted = 0
-    funding_upserted = 0
-    evidence_inserted = 0
-
     extractor_version = accepted.get("extractor_version", "unknown")
 
-    with conn:
-        with conn.cursor() as cur:
+    # -------- PEOPLE --------
+    people = []    # (name, normalized_name, role, linkedin_url)
+    people_ev = []  # (role, quote, conf) per row in `people`
+    for p in accepted.get("people", []) or []:
+        name = (p.get("name") or "").strip()
+        role = (p.get("role") or "").strip()
+        linkedin_url = (p.get("linkedin_url") or None)
+        conf = float(p.get("confidence") or 0.0)
+        quote = (p.get("evidence_quote") or "").strip()
 
-            # -------- PEOPLE --------
-            for p in accepted.get("people", []) or []:
-                name = (p.get("name") or "").strip()
-                role = (p.get("role") or "").strip()
-                linkedin_url = (p.get("linkedin_url") or None)
-                conf = float(p.get("confidence") or 0.0)
-                quote = (p.get("evidence_quote") or "").strip()
+        if not name or not quote:
+            continue
 
-                if not name or not quote:
-                    continue
+        people.append((name, _norm_name(name), role, linkedin_url))
+        people_ev.append((role, quote, conf))
 
-                normalized_name = _norm_name(name)
+    # same person twice: first name is inserted, last role wins, last known linkedin_url kept
+    people_rows, people_idx = _dedupe(
+        people,
+        key_of=lambda r: r[1],
+        merge=lambda kept, later: (kept[0], kept[1], later[2], later[3] or kept[3]),
+    )
 
-                # upsert person
-                cur.execute(
-                    """
-                    INSERT INTO people(company_id, name, normalized_name, role, linkedin_url, needs_review)
-                    VALUES (%s::uuid, %s, %s, %s, %s, FALSE)
-                    ON CONFLICT(company_id, normalized_name)
-                    DO UPDATE SET
-                        role = EXCLUDED.role,
-                        linkedin_url = COALESCE(EXCLUDED.linkedin_url, people.linkedin_url)
-                    RETURNING person_id::text
-                    """,
-                    (company_id, name, normalized_name, role, linkedin_url),
-                )
-                person_id = cur.fetchone()[0]
-                people_upserted += 1
+    # -------- EVENTS --------
+    events = []    # (type, date, title, title_hash, summary)
+    events_ev = []  # (summary, quote, conf)
+    for e in accepted.get("events", []) or []:
+        etype = (e.get("type") or "").strip()
+        date = _parse_date(e.get("date"))  # may be None
+        title = (e.get("title") or "").strip()
+        summary = (e.get("summary") or "").strip()
+        conf = float(e.get("confidence") or 0.0)
+        quote = (e.get("evidence_quote") or "").strip()
 
-                # insert evidence (append-only)
-                cur.execute(
-                    """
-                    INSERT INTO evidence(object_type, object_id, field, value, source_id, url, quote, confidence, extractor_version)
-                    VALUES ('person', %s::uuid, 'person.role', %s, %s::uuid, %s, %s, %s, %s)
-                    """,
-                    (person_id, role, source_id, url, quote, conf, extractor_version),
-                )
-                evidence_inserted += 1
+        if not etype or not title or not quote:
+            continue
 
-            # -------- EVENTS --------
-            for e in accepted.get("events", []) or []:
-                etype = (e.get("type") or "").strip()
-                date = e.get("date")  # may be None
-                title = (e.get("title") or "").strip()
-                summary = (e.get("summary") or "").strip()
-                conf = float(e.get("confidence") or 0.0)
-                quote = (e.get("evidence_quote") or "").strip()
+        events.append((etype, date, title, _title_hash(title), summary))
+        events_ev.append((summary, quote, conf))
 
-                if not etype or not title or not quote:
-                    continue
+    # -------- FUNDING ROUNDS --------
+    funding = []    # (date, title, title_hash, summary)
+    funding_ev = []  # (round_type, quote, conf)
+    for fr in accepted.get("funding_rounds", []) or []:
+        round_type = (fr.get("round_type") or "").strip()
+        amount = fr.get("amount")
+        currency = fr.get("currency")
+        date = _parse_date(fr.get("date"))
+        investors = fr.get("investors") or []
+        conf = float(fr.get("confidence") or 0.0)
+        quote = (fr.get("evidence_quote") or "").strip()
 
-                title_h = _title_hash(title)
+        if not round_type or not quote:
+            continue
 
-                cur.execute(
-                    """
-                    INSERT INTO events(company_id, type, date, title, title_hash, summary, needs_review)
-                    VALUES (%s::uuid, %s::event_type_enum, %s, %s, %s, %s, FALSE)
-                    ON CONFLICT(company_id, type, date, title_hash)
-                    DO UPDATE SET
-                        summary = EXCLUDED.summary
-                    RETURNING event_id::text
-                    """,
-                    (company_id, etype, date, title, title_h, summary),
-                )
-                event_id = cur.fetchone()[0]
-                events_upserted += 1
+        # you may have a funding_rounds table, but if not, store as event
+        # Minimal approach: store funding as event(type='funding')
+        title = f"{round_type.upper()} round"
+        summary = f"Round={round_type}; amount={amount} {currency}; investors={', '.join(investors)}"
 
-                cur.execute(
-                    """
-                    INSERT INTO evidence(object_type, object_id, field, value, source_id, url, quote, confidence, extractor_version)
-                    VALUES ('event', %s::uuid, 'event.summary', %s, %s::uuid, %s, %s, %s, %s)
-                    """,
-                    (event_id, summary, source_id, url, quote, conf, extractor_version),
-                )
-                evidence_inserted += 1
+        funding.append((date, title, _title_hash(title), summary))
+        funding_ev.append((round_type, quote, conf))
 
-            # -------- FUNDING ROUNDS --------
-            for fr in accepted.get("funding_rounds", []) or []:
-                round_type = (fr.get("round_type") or "").strip()
-                amount = fr.get("amount")
-                currency = fr.get("currency")
-                date = fr.get("date")
-                investors = fr.get("investors") or []
-                conf = float(fr.get("confidence") or 0.0)
-                quote = (fr.get("evidence_quote") or "").strip()
+    # NULL dates never conflict (each upsert inserts a new row), so only dated rows share a key;
+    # on a repeat the first title is inserted and the last summary wins
+    events_rows, events_idx = _dedupe(
+        events,
+        key_of=lambda r: (r[0], r[1], r[3]) if r[1] is not None else None,
+        merge=lambda kept, later: kept[:4] + (later[4],),
+    )
+    funding_rows, funding_idx = _dedupe(
+        funding,
+        key_of=lambda r: (r[0], r[2]) if r[0] is not None else None,
+        merge=lambda kept, later: kept[:3] + (later[3],),
+    )
 
-                if not round_type or not quote:
-                    continue
+    with conn if commit else nullcontext():
+        with conn.cursor() as cur:
+            person_ids = _upsert_returning_ids(
+                cur,
+                """
+                INSERT INTO people(company_id, name, normalized_name, role, linkedin_url, needs_review)
+                VALUES %s
+                ON CONFLICT(company_id, normalized_name)
+                DO UPDATE SET
+                    role = EXCLUDED.role,
+                    linkedin_url = COALESCE(EXCLUDED.linkedin_url, people.linkedin_url)
+                RETURNING person_id::text
+                """,
+                [(company_id,) + r for r in people_rows],
+                "(%s::uuid, %s, %s, %s, %s, FALSE)",
+            )
 
-                # you may have a funding_rounds table, but if not, store as event
-                # Minimal approach: store funding as event(type='funding')
-                title = f"{round_type.upper()} round"
-                title_h = _title_hash(title)
+            event_ids = _upsert_returning_ids(
+                cur,
+                """
+                INSERT INTO events(company_id, type, date, title, title_hash, summary, needs_review)
+                VALUES %s
+                ON CONFLICT(company_id, type, date, title_hash)
+                DO UPDATE SET
+                    summary = EXCLUDED.summary
+                RETURNING event_id::text
+                """,
+                [(company_id,) + r for r in events_rows],
+                "(%s::uuid, %s::event_type_enum, %s, %s, %s, %s, FALSE)",
+            )
 
-                summary = f"Round={round_type}; amount={amount} {currency}; investors={', '.join(investors)}"
+            funding_ids = _upsert_returning_ids(
+                cur,
+                """
+                INSERT INTO events(company_id, type, date, title, title_hash, summary, needs_review)
+                VALUES %s
+                ON CONFLICT(company_id, type, date, title_hash)
+                DO UPDATE SET summary = EXCLUDED.summary
+                RETURNING event_id::text
+                """,
+                [(company_id,) + r for r in funding_rows],
+                "(%s::uuid, 'funding'::event_type_enum, %s, %s, %s, %s, FALSE)",
+            )
 
-                cur.execute(
-                    """
-                    INSERT INTO events(company_id, type, date, title, title_hash, summary, needs_review)
-                    VALUES (%s::uuid, 'funding'::event_type_enum, %s, %s, %s, %s, FALSE)
-                    ON CONFLICT(company_id, type, date, title_hash)
-                    DO UPDATE SET summary = EXCLUDED.summary
-                    RETURNING event_id::text
-                    """,
-                    (company_id, date, title, title_h, summary),
-                )
-                event_id = cur.fetchone()[0]
-                funding_upserted += 1
+            # evidence (append-only): one row per accepted item, all in one statement
+            evidence = []
+            for i, (value, quote, conf) in zip(people_idx, people_ev):
+                evidence.append(("person", person_ids[i], "person.role", value, source_id, url, quote, conf, extractor_version))
+            for i, (value, quote, conf) in zip(events_idx, events_ev):
+                evidence.append(("event", event_ids[i], "event.summary", value, source_id, url, quote, conf, extractor_version))
+            for i, (value, quote, conf) in zip(funding_idx, funding_ev):
+                evidence.append(("event", funding_ids[i], "funding.round", value, source_id, url, quote, conf, extractor_version))
 
-                cur.execute(
+            if len(evidence) >= EVIDENCE_COPY_THRESHOLD:
+                _copy_evidence(cur, evidence)
+            elif evidence:
+                execute_values(
+                    cur,
                     """
                     INSERT INTO evidence(object_type, object_id, field, value, source_id, url, quote, confidence, extractor_version)
-                    VALUES ('event', %s::uuid, 'funding.round', %s, %s::uuid, %s, %s, %s, %s)
+                    VALUES %s
                     """,
-                    (event_id, round_type, source_id, url, quote, conf, extractor_version),
+                    evidence,
+                    template="(%s, %s::uuid, %s, %s, %s::uuid, %s, %s, %s, %s)",
+                    page_size=len(evidence),
                 )
-                evidence_inserted += 1
 
     return {
-        "people_upserted": people_upserted,
-        "events_upserted": events_upserted,
-        "funding_upserted": funding_upserted,
-        "evidence_inserted": evidence_inserted,
-    }
\ No newline at end of file
+        "people_upserted": len(people),
+        "events_upserted": len(events),
+        "funding_upserted": len(funding),
+        "evidence_inserted": len(evidence),
+    }
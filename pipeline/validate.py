@@ -5,6 +5,10 @@ EVENT_TYPES = {"funding", "partnership", "product_launch", "expansion", "acquisi
 ROUND_TYPES = {"pre_seed", "seed", "series_a", "series_b", "series_c", "series_d", "series_e", "series_f", "series_g",
                "growth", "venture_debt", "grant", "unknown"}
 
+# normalized spelling -> canonical value, so "Series_A " is accepted as "series_a"
+EVENT_TYPES_CANON = {e: e for e in EVENT_TYPES}
+ROUND_TYPES_CANON = {r: r for r in ROUND_TYPES}
+
 EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
 
 
@@ -14,6 +18,23 @@ def _quote_in_text(quote: str, text: str) -> bool:
     return quote in text
 
 
+def _quote_checker(text: str):
+    """
+    _quote_in_text bound to one chunk, memoized per quote: extractions often
+    cite the same sentence for several people/events, and each repeat would
+    otherwise rescan the chunk.
+    """
+    seen: Dict[str, bool] = {}
+
+    def check(quote: str) -> bool:
+        hit = seen.get(quote)
+        if hit is None:
+            hit = seen[quote] = _quote_in_text(quote, text)
+        return hit
+
+    return check
+
+
 def validate_extraction_for_chunk(extraction: Dict[str, Any], chunk_text: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
     """
     Returns (accepted, stats)
@@ -31,11 +52,13 @@ def validate_extraction_for_chunk(extraction: Dict[str, Any], chunk_text: str) -
         "reject_reasons": []
     }
 
+    quote_in_chunk = _quote_checker(chunk_text)
+
     # People
     for p in (extraction.get("people") or []):
         try:
             quote = (p.get("evidence_quote") or "").strip()
-            if not _quote_in_text(quote, chunk_text):
+            if not quote_in_chunk(quote):
                 stats["rejected"] += 1
                 stats["reject_reasons"].append("person_quote_not_in_text")
                 continue
@@ -56,20 +79,20 @@ def validate_extraction_for_chunk(extraction: Dict[str, Any], chunk_text: str) -
     # Events
     for e in (extraction.get("events") or []):
         try:
-            et = (e.get("type") or "").strip()
+            et = EVENT_TYPES_CANON.get((e.get("type") or "").strip().lower())
             quote = (e.get("evidence_quote") or "").strip()
 
-            if et not in EVENT_TYPES:
+            if et is None:
                 stats["rejected"] += 1
                 stats["reject_reasons"].append("event_bad_type")
                 continue
 
-            if not _quote_in_text(quote, chunk_text):
+            if not quote_in_chunk(quote):
                 stats["rejected"] += 1
                 stats["reject_reasons"].append("event_quote_not_in_text")
                 continue
 
-            accepted["events"].append(e)
+            accepted["events"].append({**e, "type": et})
             stats["events_ok"] += 1
         except Exception:
             stats["rejected"] += 1
@@ -78,15 +101,15 @@ def validate_extraction_for_chunk(extraction: Dict[str, Any], chunk_text: str) -
     # Funding rounds
     for fr in (extraction.get("funding_rounds") or []):
         try:
-            rt = (fr.get("round_type") or "").strip()
+            rt = ROUND_TYPES_CANON.get((fr.get("round_type") or "").strip().lower())
             quote = (fr.get("evidence_quote") or "").strip()
 
-            if rt not in ROUND_TYPES:
+            if rt is None:
                 stats["rejected"] += 1
                 stats["reject_reasons"].append("funding_bad_round_type")
                 continue
 
-            if not _quote_in_text(quote, chunk_text):
+            if not quote_in_chunk(quote):
                 stats["rejected"] += 1
                 stats["reject_reasons"].append("funding_quote_not_in_text")
                 continue
@@ -98,7 +121,7 @@ def validate_extraction_for_chunk(extraction: Dict[str, Any], chunk_text: str) -
                 stats["reject_reasons"].append("funding_amount_not_in_quote")
                 continue
 
-            accepted["funding_rounds"].append(fr)
+            accepted["funding_rounds"].append({**fr, "round_type": rt})
             stats["funding_ok"] += 1
         except Exception:
             stats["rejected"] += 1
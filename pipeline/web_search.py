@@ -1,17 +1,21 @@
 import os
 import sys
+import asyncio
+import re
 import time
 import hashlib
-from typing import List, Dict, Tuple
+from typing import List, Dict, Set, Tuple
 from urllib.parse import urlparse, urlunparse
 
 from dotenv import load_dotenv
 load_dotenv()
 
 import httpx
-import psycopg2
+from psycopg2.extras import execute_values
+
+from pipeline.db import get_conn
+from pipeline.normalize import URL_JUNK, split_http_url
 
-DB = os.environ["DATABASE_URL"]
 SERPAPI_KEY = os.environ.get("SERPAPI_KEY")
 
 if not SERPAPI_KEY:
@@ -44,20 +48,38 @@ QUERIES = [
 ]
 
 
-def canonicalize(url: str) -> str:
+_HTTP_RE = re.compile(r"^https?://", re.I)
+
+# "ft.com" allows ft.com and its subdomains, not "microsoft.com"
+_ALLOW_SUFFIXES = tuple("." + a for a in ALLOW_DOMAINS)
+
+
+def _split(url: str) -> Tuple[str, str, str]:
+    """
+    (scheme, netloc, path) as urlparse gives them. SerpAPI links are plain
+    http(s) urls, so those are index-split; anything else goes to urlparse.
+    """
+    if _HTTP_RE.match(url):
+        scheme, netloc, path, _ = split_http_url(url.translate(URL_JUNK))
+        return scheme.lower(), netloc, path
     p = urlparse(url)
-    return urlunparse((p.scheme, p.netloc.lower(), p.path.rstrip("/"), "", "", ""))
+    return p.scheme, p.netloc, p.path
+
+
+def canonicalize(url: str) -> str:
+    scheme, netloc, path = _split(url)
+    path = path.rstrip("/")
+    if netloc and _HTTP_RE.match(url):
+        return f"{scheme}://{netloc.lower()}{path}"
+    return urlunparse((scheme, netloc.lower(), path, "", "", ""))
 
 
 def domain_ok(url: str) -> bool:
-    d = urlparse(url).netloc.lower()
-    for a in ALLOW_DOMAINS:
-        if d.endswith(a):
-            return True
-    return False
+    d = _split(url)[1].lower()
+    return d in ALLOW_DOMAINS or d.endswith(_ALLOW_SUFFIXES)
 
 
-def serpapi_search(query: str, count: int = 8) -> List[Dict]:
+async def serpapi_search(client: httpx.AsyncClient, query: str, count: int = 8) -> List[Dict]:
     params = {
         "engine": "google",
         "q": query,
@@ -65,10 +87,9 @@ def serpapi_search(query: str, count: int = 8) -> List[Dict]:
         "api_key": SERPAPI_KEY,
     }
 
-    with httpx.Client(timeout=25, headers={"User-Agent": UA}) as client:
-        r = client.get("https://serpapi.com/search", params=params)
-        r.raise_for_status()
-        data = r.json()
+    r = await client.get("https://serpapi.com/search", params=params)
+    r.raise_for_status()
+    data = r.json()
 
     out = []
     for x in data.get("organic_results", [])[:count]:
@@ -83,6 +104,15 @@ def serpapi_search(query: str, count: int = 8) -> List[Dict]:
     return out
 
 
+async def serpapi_search_all(queries: List[str], count: int = 8) -> List[List[Dict]]:
+    """
+    Runs every query concurrently on one client (HTTP/2, so they share a
+    connection); results come back in query order.
+    """
+    async with httpx.AsyncClient(timeout=25, headers={"User-Agent": UA}, http2=True) as client:
+        return await asyncio.gather(*(serpapi_search(client, q, count) for q in queries))
+
+
 def get_company(cur, company_id: str):
     cur.execute("SELECT name, domain FROM companies WHERE company_id=%s", (company_id,))
     row = cur.fetchone()
@@ -91,60 +121,89 @@ def get_company(cur, company_id: str):
     return row[0], row[1]
 
 
-def source_exists(cur, company_id: str, url: str) -> bool:
+def existing_source_urls(cur, company_id: str, urls: List[str]) -> Set[str]:
+    """
+    Which of `urls` the company already has. Only the candidates are looked up,
+    so memory doesn't grow with the company's stored history.
+    """
+    if not urls:
+        return set()
     cur.execute(
-        "SELECT 1 FROM sources WHERE company_id=%s AND url=%s",
-        (company_id, url),
+        "SELECT url FROM sources WHERE company_id=%s AND url = ANY(%s)",
+        (company_id, list(set(urls))),
     )
-    return cur.fetchone() is not None
-
-
-def insert_source(cur, company_id: str, url: str, query: str):
-    cur.execute(
+    return {r[0] for r in cur}
+
+
+def insert_sources(cur, rows: List[Tuple[str, str, str]]) -> int:
+    """
+    rows: list of (company_id, url, query)
+    One multi-VALUES insert; returns how many were new.
+    """
+    if not rows:
+        return 0
+    inserted = execute_values(
+        cur,
         """
         INSERT INTO sources(company_id, url, source_type, fetched_at, content_hash, clean_text, discovery_query)
-        VALUES (%s, %s, 'web_search', NULL, NULL, NULL, %s)
+        VALUES %s
         ON CONFLICT(company_id, url) DO NOTHING
+        RETURNING 1
         """,
-        (company_id, url, query),
+        rows,
+        template="(%s, %s, 'web_search', NULL, NULL, NULL, %s)",
+        page_size=len(rows),
+        fetch=True,
     )
+    return len(inserted)
 
 
 def web_search_company(company_id: str, per_query: int = 8):
-    conn = psycopg2.connect(DB)
-    total_inserted = 0
+    with get_conn() as conn:
+        with conn:
+            with conn.cursor() as cur:
+                name, domain = get_company(cur, company_id)
+                print(f"[web_search] company={name} domain={domain}")
+
+                queries = [tmpl.format(name=name) for tmpl in QUERIES]
+                all_results = asyncio.run(serpapi_search_all(queries, count=per_query))
+
+                candidates = []  # (query, result count, allowed urls)
+                for q, results in zip(queries, all_results):
+                    urls = []
+                    for r in results:
+                        u = canonicalize(r["url"])
 
-    with conn:
-        with conn.cursor() as cur:
-            name, domain = get_company(cur, company_id)
-            print(f"[web_search] company={name} domain={domain}")
+                        # skip own domain
+                        if domain and domain in u:
+                            continue
 
-            for tmpl in QUERIES:
-                q = tmpl.format(name=name)
-                results = serpapi_search(q, count=per_query)
+                        # allowlist
+                        if not domain_ok(u):
+                            continue
 
-                inserted = 0
-                for r in results:
-                    u = canonicalize(r["url"])
+                        urls.append(u)
+                    candidates.append((q, len(results), urls))
 
-                    # skip own domain
-                    if domain and domain in u:
-                        continue
+                # one lookup for every candidate instead of an existence check per result;
+                # `seen` also dedupes urls returned by more than one query
+                seen = existing_source_urls(cur, company_id, [u for _, _, urls in candidates for u in urls])
 
-                    # allowlist
-                    if not domain_ok(u):
-                        continue
+                rows = []
+                for q, n_results, urls in candidates:
+                    queued = 0
+                    for u in urls:
+                        if u in seen:
+                            continue
+                        seen.add(u)
 
-                    if source_exists(cur, company_id, u):
-                        continue
+                        rows.append((company_id, u, q))
+                        queued += 1
 
-                    insert_source(cur, company_id, u, q)
-                    inserted += 1
+                    print(f"  - query='{q}' results={n_results} new={queued}")
 
-                total_inserted += inserted
-                print(f"  - query='{q}' results={len(results)} inserted={inserted}")
+                total_inserted = insert_sources(cur, rows)
 
-    conn.close()
     print(f"[web_search] total_inserted={total_inserted}")
 
 
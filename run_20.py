@@ -1,69 +1,388 @@
+import os
 import sys
-import json
-import subprocess
+import hashlib
+import importlib
+import io
+import itertools
+import multiprocessing
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from multiprocessing.connection import wait as mp_wait
 from pathlib import Path
+from urllib.parse import urlparse
 
-PY = sys.executable  # venv-safe
+import orjson
 
 
-def run_step(label, cmd, fatal=False):
-    print("\n>>>", label, "::", " ".join(cmd))
+def entry(module, func):
+    """
+    A pipeline entry point, imported on first call: steps run in this process
+    (one interpreter + import per batch, not per step), and an import-time failure
+    such as a missing SERPAPI_KEY only fails that step.
+    """
+    def call(*args):
+        return getattr(importlib.import_module(module), func)(*args)
+    call.__qualname__ = f"{module}.{func}"
+    call.module = module
+    return call
+
+
+ensure_companies = entry("pipeline.ensure_company", "ensure_companies")
+close_pool = entry("pipeline.db", "close_pool")
+discover_sources = entry("pipeline.discover", "discover_sources")
+web_search_company = entry("pipeline.web_search", "web_search_company")
+fetch_pending = entry("pipeline.fetch_pending", "fetch_pending")
+extract_all = entry("pipeline.run_extract_all", "main")
+run_diff = entry("pipeline.diff", "run_diff")
+
+
+def run_step(label, fn, *args, fatal=False):
+    # one string, one write: steps of a company may be printing from parallel threads
+    print(f"\n>>> {label} :: {fn.__qualname__}({', '.join(map(repr, args))})")
     try:
-        subprocess.check_call(cmd)
+        fn(*args)
         return True
-    except subprocess.CalledProcessError as e:
-        print(f"[WARN] step_failed label={label} rc={e.returncode}")
+    except Exception as e:
+        print(f"[WARN] step_failed label={label} err={type(e).__name__}: {e}")
         if fatal:
             raise
         return False
 
 
+def diff(cid):
+    stats = run_diff(cid)
+    print(f"[diff] company_id={cid} stats={stats}")
+
+
+# per-company steps: name -> (deps, fn, args after cid, timeout_s). Steps whose deps have
+# finished (ok or failed; every step is non-fatal) run concurrently.
+STEPS = {
+    # discovery (may fail due to TLS/blocked)
+    "discover": ((), discover_sources, (), 180),
+    # web search (usually works even if homepage fails); independent of discover
+    "web_search": ((), web_search_company, (), 120),
+    # fetch queued urls from both (should not crash on 403; your fetch_pending already skips)
+    "fetch_pending": (("discover", "web_search"), fetch_pending, (20,), 300),
+    # extraction
+    "extract_all": (("fetch_pending",), extract_all, (), 900),
+    # changes (if you have it)
+    "diff": (("extract_all",), diff, (), 120),
+}
+
+
+def run_steps(cid, steps=STEPS, max_in_flight=4):
+    """
+    Runs `steps` for one company in dependency order, independent steps in parallel
+    threads (at most max_in_flight at once, so the company's DB pool isn't swamped).
+    Returns ({step: succeeded}, abandoned futures).
+
+    A step still running past its timeout_s counts as failed and the company's
+    not-yet-started steps are skipped, so one pathological host caps out at its
+    timeouts instead of running every later step. A thread can't be killed: the overdue
+    step is abandoned and its future returned; run_company ends the process under it.
+    """
+    waiting = {name: set(step[0]) for name, step in steps.items()}
+    running = {}
+    deadlines = {}
+    ok = {}
+    abandoned = []
+    ex = ThreadPoolExecutor(max_workers=max_in_flight)
+    try:
+        while waiting or running:
+            for name in [n for n, deps in waiting.items() if not deps]:
+                del waiting[name]
+                _, fn, args, timeout_s = steps[name]
+                fut = ex.submit(run_step, name, fn, cid, *args)
+                running[fut] = name
+                deadlines[fut] = time.monotonic() + timeout_s
+
+            timeout = max(0.0, min(deadlines[f] for f in running) - time.monotonic())
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            for fut in done:
+                finished = running.pop(fut)
+                ok[finished] = fut.result()
+                for deps in waiting.values():
+                    deps.discard(finished)
+
+            now = time.monotonic()
+            for fut in [f for f in running if deadlines[f] <= now]:
+                name = running.pop(fut)
+                ok[name] = False
+                abandoned.append(fut)
+                print(f"[WARN] step_timeout label={name} timeout_s={steps[name][3]}")
+            if abandoned and waiting:
+                print(f"[WARN] steps_skipped company_id={cid} steps={','.join(waiting)} reason=timeout")
+                ok.update(dict.fromkeys(waiting, False))
+                waiting.clear()
+    finally:
+        # don't block on abandoned overdue steps here; the caller decides when to wait
+        ex.shutdown(wait=not abandoned)
+    return ok, abandoned
+
+
+def line_buffered_stdout():
+    # workers share the log: flush whole lines so companies' output doesn't splice mid-line
+    sys.stdout.reconfigure(line_buffering=True)
+
+
+# seed rows per ensure_companies call
+SEED_GROUP = 100
+
+
+def open_seed(path):
+    """
+    Binary line-iterable seed file; `.zst` seeds are decompressed as a stream
+    (bounded memory, and several times fewer disk bytes than raw JSONL).
+    """
+    if path.suffix != ".zst":
+        return path.open("rb")
+    import zstandard  # only needed for compressed seeds
+    raw = path.open("rb")
+    try:
+        reader = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+    except BaseException:
+        raw.close()
+        raise
+    return io.BufferedReader(reader, buffer_size=1 << 20)
+
+
+def iter_seed(path, limit):
+    """
+    Yields up to `limit` rows of a JSONL (or JSONL.zst) seed file, parsed one line at a time.
+    """
+    if limit <= 0:
+        return
+    n = 0
+    with open_seed(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            yield orjson.loads(line)
+            n += 1
+            if n >= limit:
+                return
+
+
+def manifest_path(seed_file):
+    return seed_file.with_name(seed_file.name + ".manifest.json")
+
+
+def load_manifest(path):
+    try:
+        return orjson.loads(path.read_bytes())
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(path, manifest):
+    # write-then-rename: an interrupted run never leaves a half-written manifest
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(orjson.dumps(manifest, option=orjson.OPT_INDENT_2))
+    os.replace(tmp, path)
+
+
+def company_key(row):
+    return hashlib.blake2b(
+        f"{row['company_name']}|{row['company_website_url']}".encode("utf-8"), digest_size=16
+    ).hexdigest()
+
+
+def process_company(i, row, cid):
+    """
+    Every step for one (already ensured) company; runs in its own process (run_company).
+    Returns ({step: succeeded}, number of steps abandoned on timeout).
+    """
+    print("\n" + "=" * 100)
+    print(f"[batch] #{i} {row['company_name']} {row['company_website_url']}")
+    print("[company_id]", cid)
+
+    ok, abandoned = run_steps(cid)
+    return ok, len(abandoned)
+
+
+def run_company(send, i, row, cid):
+    """
+    Child-process entry point: sends process_company's result (or the error) back,
+    then exits hard. A step abandoned on timeout can't be stopped from inside, but it
+    dies with the process, together with its pooled connection, HTTP/LLM requests and
+    trafilatura workers, so it never overlaps the next company's work.
+    """
+    line_buffered_stdout()
+    try:
+        send.send(("ok",) + process_company(i, row, cid))
+    except BaseException as e:
+        send.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        for child in multiprocessing.active_children():
+            child.kill()
+        sys.stdout.flush()
+        os._exit(0)
+
+
+def critical_path_s(steps=STEPS):
+    """
+    Longest chain of step timeouts: how long run_steps can take for one company.
+    """
+    memo = {}
+
+    def finish(name):
+        if name not in memo:
+            deps, _, _, timeout_s = steps[name]
+            memo[name] = max((finish(d) for d in deps), default=0) + timeout_s
+        return memo[name]
+
+    return max(finish(name) for name in steps)
+
+
+# a company process still alive this long after its start is killed (run_steps should have
+# returned by then; this only catches a step that wedged the whole process, e.g. in C code)
+COMPANY_TIMEOUT_S = critical_path_s() + 60
+# step timeouts per company website host before the rest of that host's companies are skipped
+HOST_TIMEOUT_LIMIT = int(os.environ.get("BATCH_HOST_TIMEOUT_LIMIT", "3"))
+
+
+def company_host(url):
+    host = urlparse(url if "//" in url else "//" + url).hostname or ""
+    return host.removeprefix("www.")
+
+
+def warm_imports():
+    # forked company processes inherit these instead of importing per company; an import
+    # failure (e.g. missing SERPAPI_KEY) is left for that step to report
+    for fn in (discover_sources, web_search_company, fetch_pending, extract_all, run_diff):
+        try:
+            importlib.import_module(fn.module)
+        except Exception:
+            pass
+
+
 def main():
     if len(sys.argv) < 3:
-        print("Usage: python run_20.py companies_seed.jsonl N")
+        print("Usage: python run_20.py companies_seed.jsonl[.zst] N")
         sys.exit(1)
 
     seed_file = Path(sys.argv[1])
     limit = int(sys.argv[2])
 
-    companies = []
-    with seed_file.open("r", encoding="utf-8") as f:
-        for line in f:
-            if line.strip():
-                companies.append(json.loads(line))
-            if len(companies) >= limit:
-                break
+    print(f"[batch] seed={seed_file} limit={limit}")
 
-    print(f"[batch] seed={seed_file} n={len(companies)}")
+    # resume manifest next to the seed file: companies whose diff step succeeded are
+    # skipped on rerun until the seed file changes (delete the manifest to redo all)
+    mpath = manifest_path(seed_file)
+    manifest = load_manifest(mpath)
+    seed_mtime = seed_file.stat().st_mtime_ns
 
-    for i, row in enumerate(companies, 1):
-        name = row["company_name"]
-        website = row["company_website_url"]
+    def done(key):
+        entry = manifest.get(key) or {}
+        return entry.get("status") == "done" and entry.get("seed_mtime") == seed_mtime
 
-        print("\n" + "=" * 100)
-        print(f"[batch] {i}/{len(companies)} {name} {website}")
+    skipped = 0
 
-        # ensure company
-        cid = subprocess.check_output([PY, "-m", "pipeline.ensure_company", name, website], text=True).strip()
-        print("[company_id]", cid)
+    def companies():
+        # rows are ensured SEED_GROUP at a time (one upsert round-trip per group) as they
+        # are parsed: the first companies start while the rest of the seed file is unread
+        nonlocal skipped
+        seed = enumerate(iter_seed(seed_file, limit), 1)
+        while group := list(itertools.islice(seed, SEED_GROUP)):
+            todo = []
+            for i, row in group:
+                key = company_key(row)
+                if done(key):
+                    print(f"[batch] #{i} skip(done) {row['company_name']}")
+                    skipped += 1
+                else:
+                    todo.append((i, row, key))
+            if not todo:
+                continue
+            cids = ensure_companies([(r["company_name"].strip(), r["company_website_url"].strip()) for _, r, _ in todo])
+            # company processes are forked from here: don't hand them this process's connections
+            close_pool()
+            for (i, row, key), cid in zip(todo, cids):
+                yield i, row, key, cid
 
-        # discovery (may fail due to TLS/blocked)
-        run_step("discover", [PY, "-m", "pipeline.discover", cid], fatal=False)
+    # companies are independent and their steps mostly wait on the network/DB, so run
+    # several at once, each in its own process so an overdue step can be killed with it.
+    # On Linux they are forked after warm_imports, so none re-imports the pipeline
+    workers = max(1, min(int(os.environ.get("BATCH_WORKERS", "8")), limit))
+    # each company process has its own pools, so size them against the machine and the
+    # server: up to workers x DB_POOL_MAX connections to Postgres, and workers x
+    # EXTRACT_WORKERS trafilatura processes; by default those split the cores between workers
+    os.environ.setdefault("EXTRACT_WORKERS", str(max(1, (os.cpu_count() or 1) // workers)))
+    fork = sys.platform.startswith("linux")
+    ctx = multiprocessing.get_context("fork" if fork else "spawn")
+    if fork:
+        warm_imports()
 
-        # web search (usually works even if homepage fails)
-        run_step("web_search", [PY, "-m", "pipeline.web_search", cid], fatal=False)
+    host_timeouts = Counter()
+    started = 0
+    blocked = 0
+    running = {}  # result pipe -> (process, row, key, cid, deadline)
+    pending = companies()
 
-        # fetch queued urls (should not crash on 403; your fetch_pending already skips)
-        run_step("fetch_pending", [PY, "-m", "pipeline.fetch_pending", cid, "20"], fatal=False)
+    def start_next():
+        nonlocal started, blocked
+        for i, row, key, cid in pending:
+            host = company_host(row["company_website_url"])
+            if host_timeouts[host] >= HOST_TIMEOUT_LIMIT:
+                print(f"[batch] #{i} skip(host_timeouts) {row['company_name']} host={host}")
+                blocked += 1
+                continue
+            recv, send = ctx.Pipe(duplex=False)
+            sys.stdout.flush()  # a forked child would repeat anything still buffered
+            proc = ctx.Process(target=run_company, args=(send, i, row, cid))
+            proc.start()
+            send.close()  # the child holds the write end; EOF here means it died
+            running[recv] = (proc, row, key, cid, time.monotonic() + COMPANY_TIMEOUT_S)
+            started += 1
+            return True
+        return False
 
-        # extraction
-        run_step("extract_all", [PY, "-m", "pipeline.run_extract_all", cid], fatal=False)
+    def finish(recv, result, timeouts):
+        proc, row, key, cid, _ = running.pop(recv)
+        recv.close()
+        proc.join(5)
+        if proc.is_alive():
+            proc.kill()
+            proc.join()
+        if timeouts:
+            host = company_host(row["company_website_url"])
+            host_timeouts[host] += timeouts
+            if host_timeouts[host] - timeouts < HOST_TIMEOUT_LIMIT <= host_timeouts[host]:
+                print(f"[WARN] host_blocked host={host} timeouts={host_timeouts[host]}")
+        if result is None:
+            return
+        status, *rest = result
+        if status == "error":
+            print(f"[WARN] company_failed name={row['company_name']} err={rest[0]}")
+        elif rest[0].get("diff"):
+            manifest[key] = {"status": "done", "seed_mtime": seed_mtime, "company_id": cid}
+            save_manifest(mpath, manifest)
 
-        # changes (if you have it)
-        run_step("diff", [PY, "-m", "pipeline.run_diff", cid], fatal=False)
+    while True:
+        while len(running) < workers and start_next():
+            pass
+        if not running:
+            break
+        timeout = max(0.0, min(r[4] for r in running.values()) - time.monotonic())
+        for recv in mp_wait(list(running), timeout=timeout):
+            try:
+                result = recv.recv()
+            except EOFError:
+                row = running[recv][1]
+                print(f"[WARN] company_failed name={row['company_name']} err=process exited without a result")
+                finish(recv, None, 0)
+                continue
+            finish(recv, result, result[2] if result[0] == "ok" else 0)
+        now = time.monotonic()
+        for recv in [r for r, v in running.items() if v[4] <= now]:
+            proc, row = running[recv][:2]
+            print(f"[WARN] company_timeout name={row['company_name']} timeout_s={COMPANY_TIMEOUT_S}")
+            proc.kill()
+            finish(recv, None, 1)
 
-    print("\n[BATCH DONE]")
+    print(f"\n[BATCH DONE] companies={started} skipped_done={skipped} skipped_host_timeouts={blocked}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,12 @@
+-- Home.load_companies search: lower(name|domain) LIKE '%q%' can use trigram GIN indexes.
+-- The non-search path (ORDER BY updated_at DESC LIMIT 200) becomes an index scan.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS companies_lower_name_trgm_idx
+    ON companies USING gin (lower(name) gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS companies_lower_domain_trgm_idx
+    ON companies USING gin (lower(domain) gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS companies_updated_at_idx
+    ON companies (updated_at DESC);
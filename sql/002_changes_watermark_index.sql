@@ -0,0 +1,3 @@
+-- diff.get_watermark: MAX(detected_at) per company as an index-only scan.
+CREATE INDEX IF NOT EXISTS changes_company_detected_at_idx
+    ON changes (company_id, detected_at DESC);
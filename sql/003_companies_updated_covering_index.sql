@@ -0,0 +1,6 @@
+-- Home.load_companies (no search): ORDER BY updated_at DESC LIMIT 200 as an index-only scan,
+-- no sort and no heap fetches. Supersedes companies_updated_at_idx from 001.
+CREATE INDEX IF NOT EXISTS companies_updated_desc
+    ON companies (updated_at DESC) INCLUDE (company_id, name, website, domain);
+
+DROP INDEX IF EXISTS companies_updated_at_idx;
@@ -0,0 +1,3 @@
+-- fetch: HTTP validators from the last 200, sent back as If-None-Match / If-Modified-Since.
+ALTER TABLE sources ADD COLUMN IF NOT EXISTS etag text;
+ALTER TABLE sources ADD COLUMN IF NOT EXISTS last_modified text;
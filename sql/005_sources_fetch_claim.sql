@@ -0,0 +1,2 @@
+-- fetch_pending: lease timestamp so parallel workers claim disjoint pending rows.
+ALTER TABLE sources ADD COLUMN IF NOT EXISTS fetch_claimed_at timestamptz;
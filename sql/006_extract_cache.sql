@@ -0,0 +1,9 @@
+-- run_extract_all: LLM extraction results keyed by sha256(company_name \0 chunk text),
+-- so re-runs and duplicated boilerplate chunks skip the LLM call.
+CREATE TABLE IF NOT EXISTS extract_cache (
+    chunk_sha256      text PRIMARY KEY,
+    company_name      text NOT NULL,
+    extraction_json   jsonb NOT NULL,
+    extractor_version text NOT NULL,
+    created_at        timestamptz NOT NULL DEFAULT now()
+);
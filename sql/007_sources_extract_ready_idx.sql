@@ -0,0 +1,6 @@
+-- run_extract_all.iter_sources: one company's extractable sources, newest first, straight
+-- from a partial index instead of scanning its rows and computing length(clean_text).
+-- The WHERE clause and sort must stay in step with that query for the planner to use it.
+CREATE INDEX IF NOT EXISTS sources_extract_ready_idx
+    ON sources (company_id, fetched_at DESC NULLS LAST)
+    WHERE clean_text IS NOT NULL AND length(clean_text) >= 500;
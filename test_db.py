@@ -1,13 +1,7 @@
-import os
-from dotenv import load_dotenv
-import psycopg2
+from pipeline.db import get_conn
 
-load_dotenv()
-
-conn = psycopg2.connect(os.environ["DATABASE_URL"])
-cur = conn.cursor()
-
-cur.execute("SELECT now();")
-print(cur.fetchone())
-
-conn.close()
+# goes through the same pool the pipeline uses (get_conn loads .env)
+with get_conn() as conn:
+    with conn.cursor() as cur:
+        cur.execute("SELECT now();")
+        print(cur.fetchone())
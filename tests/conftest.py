@@ -0,0 +1,65 @@
+import os
+import sys
+from pathlib import Path
+
+import psycopg2
+import pytest
+from psycopg2 import extensions
+
+ROOT = Path(__file__).resolve().parents[1]
+# the console pages import `_db` from app/
+sys.path.insert(0, str(ROOT / "app"))
+sys.path.insert(0, str(ROOT))
+# db modules read it at import; no test talks to a real server
+os.environ["DATABASE_URL"] = "postgresql://scout@localhost/scout_test"
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.connection = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.connection.executed.append(query)
+
+
+class FakeInfo:
+    transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+
+class FakeConnection:
+    """Enough of a psycopg2 connection for the pools and execute_prepared."""
+
+    def __init__(self):
+        self.closed = 0
+        self.info = FakeInfo()
+        self.prepared = {}
+        self.executed = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def fake_connect(monkeypatch):
+    """Patches psycopg2.connect; returns the list of connections it opened."""
+    opened = []
+
+    def connect(*args, **kwargs):
+        conn = FakeConnection()
+        opened.append(conn)
+        return conn
+
+    monkeypatch.setattr(psycopg2, "connect", connect)
+    return opened
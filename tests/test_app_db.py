@@ -0,0 +1,37 @@
+import _db
+
+
+def test_pool_keeps_concurrently_borrowed_connections(fake_connect):
+    pool = _db.RetainingPool(1, 4, "dsn")
+    first = [pool.getconn() for _ in range(4)]
+    for conn in first:
+        pool.putconn(conn)
+
+    second = [pool.getconn() for _ in range(4)]
+
+    assert len(fake_connect) == 4
+    assert {id(c) for c in second} == {id(c) for c in first}
+    assert not any(c.closed for c in fake_connect)
+
+
+def test_prepared_statements_survive_concurrent_borrows(fake_connect, monkeypatch):
+    monkeypatch.setattr(_db, "USE_PREPARED", True)
+    pool = _db.RetainingPool(1, 4, "dsn")
+    query = "SELECT name FROM companies WHERE company_id = %s::uuid"
+
+    def run_on_two_borrowed():
+        a, b = pool.getconn(), pool.getconn()
+        for conn in (a, b):
+            with conn.cursor() as cur:
+                _db.execute_prepared(cur, "company_name", query, ("cid",))
+        pool.putconn(a)
+        pool.putconn(b)
+
+    run_on_two_borrowed()
+    for conn in fake_connect:
+        conn.executed.clear()
+    run_on_two_borrowed()
+
+    assert len(fake_connect) == 2
+    for conn in fake_connect:
+        assert conn.executed == ["EXECUTE company_name(%s)"]
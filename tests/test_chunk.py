@@ -0,0 +1,25 @@
+from pipeline.chunk import chunk_text
+
+PARAS = [
+    "Acme Robotics announced a new funding round today, led by Example Ventures.",
+    "The company was founded in 2019 by Jane Doe and John Roe and builds warehouse robots.",
+    "Its platform is used by logistics teams across Europe and North America to automate picking.",
+]
+
+
+def _chunks(text, **kwargs):
+    return [(c.heading, c.raw) for c in chunk_text(text, **kwargs)]
+
+
+def test_crlf_input_chunks_like_lf():
+    lf = "\n\n".join(p.replace(", ", ",\n") for p in PARAS)
+    crlf = lf.replace("\n", "\r\n")
+    assert _chunks(crlf, max_chars=120) == _chunks(lf, max_chars=120)
+    # CRLF line breaks inside a paragraph fold to spaces, not paragraph breaks
+    assert _chunks(crlf, max_chars=2400)[0][1].count("\n\n") == len(PARAS) - 1
+
+
+def test_other_splitlines_boundaries_split_paragraphs():
+    lf = "\n\n".join(PARAS)
+    for sep in ("\r", "\x0c", "\u2028", "\u2029", "\x85"):
+        assert _chunks(lf.replace("\n", sep), max_chars=120) == _chunks(lf, max_chars=120)
@@ -0,0 +1,34 @@
+from contextlib import ExitStack
+
+import pytest
+
+from pipeline import db
+
+
+@pytest.fixture
+def fresh_pool(fake_connect, monkeypatch):
+    monkeypatch.setattr(db, "_pool", None)
+    yield fake_connect
+    db.close_pool()
+
+
+def test_concurrent_checkouts_are_reused(fresh_pool):
+    n = 8
+    with ExitStack() as stack:
+        first = [stack.enter_context(db.get_conn()) for _ in range(n)]
+    with ExitStack() as stack:
+        second = [stack.enter_context(db.get_conn()) for _ in range(n)]
+
+    assert len(fresh_pool) == n
+    assert {id(c) for c in second} == {id(c) for c in first}
+    assert not any(c.closed for c in first)
+
+
+def test_closed_connection_is_dropped(fresh_pool):
+    with db.get_conn() as conn:
+        conn.close()
+    with db.get_conn() as again:
+        pass
+
+    assert again is not conn
+    assert len(fresh_pool) == 2
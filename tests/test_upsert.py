@@ -0,0 +1,69 @@
+import datetime
+
+from pipeline import upsert
+
+
+class FakeCursor:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeConn:
+    def cursor(self):
+        return FakeCursor()
+
+
+def _persist(monkeypatch, accepted):
+    calls = []
+
+    def execute_values(cur, query, rows, template=None, page_size=100, fetch=False):
+        calls.append((query, rows))
+        return [(f"id-{len(calls)}-{i}",) for i in range(len(rows))]
+
+    monkeypatch.setattr(upsert, "execute_values", execute_values)
+    upsert.persist_accepted_extraction(FakeConn(), "cid", "sid", "https://acme.example/news", accepted, commit=False)
+    return calls
+
+
+def _event(date, summary):
+    return {"type": "launch", "date": date, "title": "Acme launches Widget", "summary": summary,
+            "confidence": 0.9, "evidence_quote": summary}
+
+
+def test_same_event_date_spelled_two_ways_is_one_values_row(monkeypatch):
+    calls = _persist(monkeypatch, {"events": [_event("2024-01-01", "first"), _event("2024-1-1", "second")]})
+
+    events_query, event_rows = calls[0]
+    assert "INSERT INTO events" in events_query
+    assert len(event_rows) == 1
+    # first spelling/title is inserted, last summary wins, like sequential upserts
+    assert event_rows[0][2] == datetime.date(2024, 1, 1) and event_rows[0][-1] == "second"
+
+    _, evidence = calls[1]
+    assert [row[1] for row in evidence] == ["id-1-0", "id-1-0"]
+
+
+def test_datetime_and_prose_spellings_of_one_date_are_one_values_row(monkeypatch):
+    calls = _persist(monkeypatch, {"events": [_event("2024-01-01", "a"), _event("2024-01-01T00:00:00Z", "b"),
+                                              _event("Jan 1, 2024", "c")]})
+
+    _, event_rows = calls[0]
+    assert len(event_rows) == 1
+    assert event_rows[0][2] == datetime.date(2024, 1, 1) and event_rows[0][-1] == "c"
+
+
+def test_distinct_and_unparseable_dates_stay_separate(monkeypatch):
+    calls = _persist(monkeypatch, {"events": [_event("2024-01-01", "a"), _event("2024-01-02", "b"),
+                                              _event("early 2024", "c"), _event(None, "d"), _event(None, "e")]})
+    assert len(calls[0][1]) == 5
+
+
+def test_parse_date():
+    jan1 = datetime.date(2024, 1, 1)
+    for spelling in ("2024-1-1", " 2024-01-01 ", "20240101", "2024-01-01T09:30:00+02:00", "January 1, 2024"):
+        assert upsert._parse_date(spelling) == jan1
+    for partial_or_bad in ("2024-02-30", "early 2024", "March 2024", "2024", "", None):
+        assert upsert._parse_date(partial_or_bad) is None